@@ -1,49 +1,2208 @@
-import requests
+import os
+import csv
+import re
 import json
-import asyncio
-import aiohttp
+import time
+import logging
+import marshal
+import random
+import operator
+import atexit
+import importlib
+import threading
+from array import array
+from collections import OrderedDict, deque
 
-# Access to Notion database requires security key. Refer to https://developers.notion.com/docs/getting-started
-from notion_key import key
 
+class _LazyModule:
+    """
+    Module imported when one of its attributes is first used, so importing this module stays fast for scripts that
+    only read cached data
+    """
 
-class Notion:
+    def __init__(self, name):
+        self.__name = name
+        self.__module = None
+
+    def __getattr__(self, attribute):
+        # Only called for attributes not found on the proxy - every attribute of the module
+        if self.__module is None:
+            self.__module = importlib.import_module(self.__name)
+        value = getattr(self.__module, attribute)
+        # Later uses of the attribute are found without calling this
+        setattr(self, attribute, value)
+        return value
+
+
+asyncio = _LazyModule('asyncio')
+aiohttp = _LazyModule('aiohttp')
+futures = _LazyModule('concurrent.futures')
+multiprocessing = _LazyModule('multiprocessing')
+statistics = _LazyModule('statistics')
+email_utils = _LazyModule('email.utils')
+datetime = _LazyModule('datetime')
+
+def _find_key():
+    """
+    Gets key of the Notion integration from the NOTION_KEY environment variable, or from notion_key.py.
+    Refer to https://developers.notion.com/docs/getting-started
+    :return: Key, or None if there is none
+    """
+    if os.environ.get('NOTION_KEY'):
+        return os.environ['NOTION_KEY']
+    try:
+        from notion_key import key
+    except ImportError:
+        return None
+    return key
+
+
+# Silent unless the application configures logging, or log_to() is used
+logger = logging.getLogger('Notion')
+logger.addHandler(logging.NullHandler())
+
+
+class JsonLinesHandler(logging.FileHandler):
+    """
+    Logging handler that writes each record as one line of JSON, including the 'event' given with it
+    """
+
+    def format(self, record):
+        line = {'time': record.created, 'level': record.levelname, 'message': record.getMessage()}
+        if hasattr(record, 'event'):
+            line['event'] = record.event
+        return json.dumps(line)
+
+
+def log_to(filename, level=logging.INFO):
+    """
+    Writes log of the client to a JSON lines file. Use level=logging.DEBUG to include every request
+    :param filename: Format: 'fileName.jsonl'
+    :param level: Lowest level of records written
+    :return: Handler added, which can be removed with logger.removeHandler()
+    """
+    handler = JsonLinesHandler(filename, encoding='utf-8')
+    handler.setLevel(level)
+    logger.addHandler(handler)
+    if logger.level == logging.NOTSET or logger.level > level:
+        logger.setLevel(level)
+    return handler
+
+
+class Metrics:
+    """
+    Counters of requests sent by a transport and of columns decoded.
+    Hooks can be added to be called with each event as it is recorded.
+    """
+
+    # Upper bounds in seconds of the buckets of the latency histograms
+    buckets = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf'))
+
+    # Matches IDs in URLs, so requests are counted by endpoint
+    id_pattern = re.compile(r'/(databases|pages|properties|blocks)/[^/?]+')
+
+    def __init__(self):
+        # Functions called with each event
+        self.hooks = []
+        self.reset()
+
+    def reset(self):
+        """
+        Sets all counters to zero
+        """
+        # Endpoint -> count
+        self.requests = {}
+        # Endpoint -> count of requests in each latency bucket
+        self.latency = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.throttled = 0
+        self.retries = 0
+        self.errors = 0
+        # Column name -> total seconds spent decoding
+        self.decode_time = {}
+
+    def endpoint(self, method, url):
+        """
+        Gets name of endpoint of a request, e.g. 'POST /databases/{id}/query'
+        """
+        path = url.split('/v1', 1)[-1].split('?', 1)[0]
+        path = self.id_pattern.sub(r'/\1/{id}', path)
+        return f'{method} {path}'
+
+    def record_request(self, method, url, status, seconds, sent, received, attempt):
+        """
+        Records one attempt of a request
+        :param status: Response status, or None if the request failed to connect
+        :param seconds: Time from sending request to reading response
+        :param sent: Bytes in request body
+        :param received: Bytes in response body
+        :param attempt: Number of attempts before this one
+        """
+        endpoint = self.endpoint(method, url)
+        self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+        histogram = self.latency.setdefault(endpoint, [0] * len(self.buckets))
+        histogram[next(i for i, bound in enumerate(self.buckets) if seconds <= bound)] += 1
+        self.bytes_sent += sent
+        self.bytes_received += received
+        self.retries += attempt > 0
+        self.throttled += status == 429
+        self.errors += status is None or status >= 400
+        event = {
+            'type': 'request', 'endpoint': endpoint, 'status': status, 'seconds': seconds, 'sent': sent,
+            'received': received, 'attempt': attempt
+        }
+        logger.debug(f'{endpoint} {status} {seconds:.3f}s', extra={'event': event})
+        self._emit(event)
+
+    def record_decode(self, column_name, seconds):
+        """
+        Records time spent decoding a column
+        """
+        self.decode_time[column_name] = self.decode_time.get(column_name, 0) + seconds
+        event = {'type': 'decode', 'column': column_name, 'seconds': seconds}
+        logger.debug(f'Decoded "{column_name}" in {seconds:.3f}s', extra={'event': event})
+        self._emit(event)
+
+    def _emit(self, event):
+        for hook in self.hooks:
+            hook(event)
+
+    def summary(self):
+        """
+        Gets all counters
+        :return: Dictionary of counters
+        """
+        return {
+            'requests': dict(self.requests),
+            'latency': {
+                'buckets': list(self.buckets),
+                'counts': {endpoint: list(counts) for endpoint, counts in self.latency.items()}
+            },
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+            'throttled': self.throttled,
+            'retries': self.retries,
+            'errors': self.errors,
+            'decode_time': dict(self.decode_time)
+        }
+
+
+class Transport:
+    """
+    Connection pool shared by all requests to the Notion API.
+    Requests are limited to an average rate with a token bucket, limited in number at any one time, and retried on
+    429 and 5xx responses. Runs its own event loop on a background thread, so it can be used from synchronous code.
+    Refer to https://developers.notion.com/reference/request-limits
+    """
+
+    # Response statuses that are retried
+    retry_statuses = {429, 500, 502, 503, 504}
+
+    # Transport used by all Notion objects unless one is given
+    _shared = None
+
+    def __init__(self, rate=3, burst=3, max_concurrency=10, max_retries=5, backoff=0.5):
+        """
+        :param rate: Average number of requests sent per second. Notion allows an average of 3
+        :param burst: Number of requests that can be sent at once before the rate applies
+        :param max_concurrency: Maximum number of requests in flight at any one time
+        :param max_retries: Number of times a request is retried before its last response is returned
+        :param backoff: Delay in seconds before the first retry - doubled on each retry
+        """
+        self.metrics = Metrics()
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        # Token bucket state - the rate in use is halved on each 429 response and recovers on success
+        self.current_rate = rate
+        self.throttled_until = 0
+        self.tokens = burst
+        self.updated = time.monotonic()
+        # Start event loop - session, lock and semaphore are created on it when first used
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.session = None
+        self._lock = None
+        self._semaphore = None
+        atexit.register(self.close)
+
+    @classmethod
+    def shared(cls):
+        """
+        Gets transport shared by all Notion objects, creating it on first use
+        """
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def run(self, coroutine):
+        """
+        Runs coroutine on the transport's event loop and waits for its result
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    async def call(self, coroutine):
+        """
+        Runs coroutine on the transport's event loop and awaits its result, from any event loop
+        """
+        if asyncio.get_running_loop() is self.loop:
+            return await coroutine
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, self.loop))
+
+    def submit(self, method, url, headers, data=None, raw=False):
+        """
+        Starts a request without waiting for it
+        :return: concurrent.futures.Future holding response JSON, or the response body if raw is True
+        """
+        return asyncio.run_coroutine_threadsafe(self.request(method, url, headers, data, raw), self.loop)
+
+    def close(self):
+        """
+        Closes connection pool and stops event loop
+        """
+        if self.loop.is_closed() or not self.loop.is_running():
+            return
+        if self.session is not None:
+            self.run(self.session.close())
+            self.session = None
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    async def _acquire(self):
+        """
+        Waits until a token is available in the bucket and takes it
+        """
+        async with self._lock:
+            while True:
+                # Refill bucket for time passed since last update
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.current_rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.current_rate)
+
+    async def request(self, method, url, headers, data=None, raw=False):
+        """
+        Sends request, retrying on 429 and 5xx responses and connection errors.
+        Retries wait for the 'Retry-After' header if given, otherwise for an exponential backoff, plus random jitter.
+        :param method: HTTP method
+        :param url: URL to send request to
+        :param headers: Request headers
+        :param data: Request body as a JSON string
+        :param raw: If True, the response body is returned without parsing it
+        :return: Response JSON, or the response body as bytes if raw is True. A body that is not JSON gives an error
+        object
+        """
+        if self.session is None:
+            self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.max_concurrency))
+            self._lock = asyncio.Lock()
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        attempt = 0
+        while True:
+            await self._acquire()
+            delay = self.backoff * 2 ** attempt
+            start = time.perf_counter()
+            try:
+                async with self._semaphore:
+                    # Latency does not include time waiting for other requests
+                    start = time.perf_counter()
+                    async with self.session.request(method, url, headers=headers, data=data) as response:
+                        body = await response.read()
+                        self.metrics.record_request(
+                            method, url, response.status, time.perf_counter() - start, len(data or ''), len(body),
+                            attempt
+                        )
+                        if response.status not in self.retry_statuses or attempt == self.max_retries:
+                            if response.status < 400:
+                                self.current_rate = min(self.rate, self.current_rate + self.rate / 100)
+                            if raw:
+                                return body
+                            if not body:
+                                return {}
+                            try:
+                                return json.loads(body)
+                            except ValueError:
+                                # Proxies in front of the API answer some errors with HTML
+                                return {
+                                    'object': 'error', 'status': response.status, 'code': 'invalid_json',
+                                    'message': f'Response is not JSON: {body[:100]!r}'
+                                }
+                        logger.info(f'{method} {url} returned {response.status} - retrying')
+                        # Wait as long as the server asks for
+                        if 'Retry-After' in response.headers:
+                            delay = self._retry_after(response.headers['Retry-After'], delay)
+                        # Slow down and empty bucket so other requests also wait instead of being throttled in turn
+                        # Requests throttled together only slow down the rate once
+                        if response.status == 429 and time.monotonic() >= self.throttled_until:
+                            self.current_rate = max(self.current_rate / 2, 0.1)
+                            self.tokens = min(self.tokens, -delay * self.current_rate)
+                            self.throttled_until = time.monotonic() + delay
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as error:
+                self.metrics.record_request(
+                    method, url, None, time.perf_counter() - start, len(data or ''), 0, attempt
+                )
+                if attempt == self.max_retries:
+                    raise
+                logger.info(f'{method} {url} failed with {error!r} - retrying')
+            # Jitter spreads out retries of requests that failed together
+            await asyncio.sleep(delay + random.uniform(0, self.backoff))
+            attempt += 1
+
+    @staticmethod
+    def _retry_after(header, default):
+        """
+        Gets seconds to wait before retrying from a 'Retry-After' header, given as seconds or as an HTTP date
+        :param header: Value of header
+        :param default: Seconds returned if the header cannot be parsed
+        :return: Seconds to wait
+        """
+        try:
+            seconds = float(header)
+        except ValueError:
+            seconds = None
+        if seconds is not None:
+            # Also rejects nan
+            return seconds if 0 <= seconds < float('inf') else default
+        try:
+            date = email_utils.parsedate_to_datetime(header)
+        except (TypeError, ValueError):
+            return default
+        # Dates without a time zone are in UTC
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=datetime.timezone.utc)
+        return max(date.timestamp() - time.time(), 0.0)
+
+    async def request_all(self, method, urls, headers, data_list=None):
+        """
+        Sends many requests concurrently, within the rate and concurrency limits.
+        A fixed number of workers take requests in turn, so only max_concurrency requests exist at any one time.
+        Requests that still fail to connect after retrying give an error object instead of raising.
+        :return: List of response JSON, in the same order as urls
+        """
+        if data_list is None:
+            data_list = [None] * len(urls)
+
+        async def send(url, data):
+            try:
+                return await self.request(method, url, headers, data)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                return {'object': 'error', 'message': repr(error)}
+
+        return await self.map(send, list(zip(urls, data_list)))
+
+    async def map(self, function, items):
+        """
+        Runs a coroutine function on each item, with at most max_concurrency running at any one time
+        :param function: Coroutine function, called with the elements of each item as arguments
+        :param items: List of tuples of arguments
+        :return: List of results, in the same order as items
+        """
+        results = [None] * len(items)
+        # Shared by all workers - each item is taken by exactly one worker
+        jobs = iter(enumerate(items))
+
+        async def worker():
+            for i, item in jobs:
+                results[i] = await function(*item)
+
+        await asyncio.gather(*[worker() for _ in range(min(self.max_concurrency, len(items)))])
+        return results
+
+
+class Query:
+    """
+    Query of the rows of a Notion database, built by chaining where() and sort().
+    Conditions on title, text, number, select, status and date columns are sent to the API as a filter, so only
+    matching rows are downloaded. Other conditions are checked on the downloaded rows.
+    Refer to https://developers.notion.com/reference/post-database-query-filter
+    """
+
+    # Filter condition for each operator, by type of column
+    conditions = {
+        'title': {
+            '==': 'equals', '!=': 'does_not_equal', 'contains': 'contains', 'starts_with': 'starts_with',
+            'ends_with': 'ends_with'
+        },
+        'rich_text': {
+            '==': 'equals', '!=': 'does_not_equal', 'contains': 'contains', 'starts_with': 'starts_with',
+            'ends_with': 'ends_with'
+        },
+        'number': {
+            '==': 'equals', '!=': 'does_not_equal', '>': 'greater_than', '<': 'less_than',
+            '>=': 'greater_than_or_equal_to', '<=': 'less_than_or_equal_to'
+        },
+        'select': {'==': 'equals', '!=': 'does_not_equal'},
+        'status': {'==': 'equals', '!=': 'does_not_equal'},
+        'date': {'==': 'equals', '>': 'after', '<': 'before', '>=': 'on_or_after', '<=': 'on_or_before'},
+    }
+
+    # Function for each operator, used to check conditions locally
+    operators = {
+        '==': operator.eq,
+        '!=': operator.ne,
+        '>': lambda a, b: a is not None and a > b,
+        '<': lambda a, b: a is not None and a < b,
+        '>=': lambda a, b: a is not None and a >= b,
+        '<=': lambda a, b: a is not None and a <= b,
+        'contains': lambda a, b: a is not None and b in a,
+        'starts_with': lambda a, b: a is not None and a.startswith(b),
+        'ends_with': lambda a, b: a is not None and a.endswith(b),
+    }
+
+    def __init__(self, notion):
+        """
+        :param notion: Notion object of the database being queried
+        """
+        self.notion = notion
+        # Conditions added by where() - list of (column name, operator, value)
+        self.conditions_added = []
+        self.sorts = []
+
+    def where(self, column_name, operator, value=None):
+        """
+        Adds condition that rows must match
+        :param column_name: Name of column
+        :param operator: One of '==', '!=', '>', '<', '>=', '<=', 'contains', 'starts_with', 'ends_with',
+        or a function that takes the value of the column and returns True for matching rows
+        :param value: Value to compare to. Comparing to None with '==' or '!=' checks for empty values
+        :return: Query, so calls can be chained
+        """
+        if not callable(operator) and operator not in self.operators:
+            raise ValueError(f'Unknown operator "{operator}"')
+        # Types of columns are only needed when the query is sent, so no requests are sent here
+        self.conditions_added.append((column_name, operator, value))
+        return self
+
+    def sort(self, column_name, descending=False):
+        """
+        Sorts rows by a column. Sorts added first take priority
+        :param column_name: Name of column
+        :param descending: If True, sort from largest to smallest
+        :return: Query, so calls can be chained
+        """
+        self.sorts.append({'property': column_name, 'direction': 'descending' if descending else 'ascending'})
+        return self
+
+    def plan(self):
+        """
+        Splits conditions into those sent to the API and those checked locally, by the type of their column.
+        Types of columns must have been fetched - rows() and get() fetch them
+        :return: (list of filter objects, list of (column name, function of value))
+        """
+        filters = []
+        checks = []
+        for column_name, operator, value in self.conditions_added:
+            # Functions can only be checked locally
+            if callable(operator):
+                checks.append((column_name, operator))
+                continue
+            column_type = self.notion._column_type(column_name)
+            conditions = self.conditions.get(column_type, {})
+            if value is None and operator in ('==', '!=') and conditions:
+                # Check for empty values
+                condition, argument = ('is_empty' if operator == '==' else 'is_not_empty'), True
+            else:
+                condition, argument = conditions.get(operator), value
+            if condition is None:
+                # Condition cannot be sent to the API
+                check = self.operators[operator]
+                checks.append((column_name, lambda item, check=check, value=value: check(item, value)))
+            else:
+                filters.append({'property': column_name, column_type: {condition: argument}})
+        return filters, checks
+
+    def body(self):
+        """
+        Gets body of query request, fetching the types of columns if required
+        """
+        self.notion._load_schema()
+        return self._body()
+
+    def _body(self):
+        """
+        Gets body of query request - types of columns must have been fetched. Refer to plan()
+        """
+        filters, _ = self.plan()
+        body = {}
+        if len(filters) == 1:
+            body['filter'] = filters[0]
+        elif filters:
+            body['filter'] = {'and': filters}
+        if self.sorts:
+            body['sorts'] = self.sorts
+        return body
+
+    def _checks(self):
+        """
+        Gets decoder of each column checked locally
+        :return: List of (column name, Column, function of value)
+        """
+        _, checks = self.plan()
+        return [
+            (column_name, self.notion._new_column(self.notion._column_type(column_name)), check)
+            for column_name, check in checks
+        ]
+
+    def rows(self):
+        """
+        Generator that yields each matching row. Only the types of columns are fetched before querying - rows that
+        are not loaded are not downloaded
+        :return: Yields each row (page object) in JSON format
+        """
+        self.notion._load_schema()
+        checks = self._checks()
+        for row in self.notion.rows(self._body()):
+            if all(check(column.decode(row['properties'][column_name])) for column_name, column, check in checks):
+                yield row
+
+    def __iter__(self):
+        return self.rows()
+
+    def get(self, column_name):
+        """
+        Gets column of the matching rows
+        :param column_name: Name of column
+        :return: Returns column as a list
+        """
+        self.notion._load_schema()
+        column = self.notion._new_column(self.notion._column_type(column_name))
+        return [column.decode(row['properties'][column_name]) for row in self.rows()]
+
+    def ids(self):
+        """
+        Gets ordered list of IDs of the matching rows
+        """
+        return [row['id'] for row in self.rows()]
+
+
+class AsyncQuery(Query):
+    """
+    Query of the rows of a Notion database, for AsyncNotion. Refer to Query
+    """
+
+    async def rows(self):
+        """
+        Async generator that yields each matching row
+        :return: Yields each row (page object) in JSON format
+        """
+        await self.notion._load_schema()
+        checks = self._checks()
+        async for row in self.notion.rows(self._body()):
+            if all(check(column.decode(row['properties'][column_name])) for column_name, column, check in checks):
+                yield row
+
+    def body(self):
+        """
+        Gets body of query request. Types of columns must have been fetched, e.g. by load(), rows() or get()
+        """
+        return self._body()
+
+    def __aiter__(self):
+        return self.rows()
+
+    async def get(self, column_name):
+        """
+        Gets column of the matching rows
+        :param column_name: Name of column
+        :return: Returns column as a list
+        """
+        await self.notion._load_schema()
+        column = self.notion._new_column(self.notion._column_type(column_name))
+        return [column.decode(row['properties'][column_name]) async for row in self.rows()]
+
+    async def ids(self):
+        """
+        Gets ordered list of IDs of the matching rows
+        """
+        return [row['id'] async for row in self.rows()]
+
+
+class WriteQueue:
+    """
+    Write-behind queue of edits to a Notion database. Edits are kept until the queue is flushed, and later edits to
+    the same row and column replace earlier ones, so rapid edits to a cell send one request. Edits to the same row are
+    sent in one request.
+    The queue is flushed when max_edits edits are waiting, max_delay seconds after the first waiting edit, on flush(),
+    and when used as a context manager, on leaving the block.
+    Before writing, each row's 'last_edited_time' is compared to its value when the row was first edited in the
+    queue. Rows edited since, e.g. by another client, are not overwritten - they are reported as conflicts, and their
+    stored values are brought up to date, so edits can be checked and queued again.
+    """
+
+    def __init__(self, notion, max_edits=100, max_delay=1.0, on_conflict=None):
+        """
+        :param notion: AsyncNotion of the database being edited
+        :param max_edits: Number of waiting edits that flushes the queue
+        :param max_delay: Seconds an edit can wait before the queue is flushed, or None to only flush on size or
+        flush()
+        :param on_conflict: Function called with the report of each conflicting row, including rows flushed in the
+        background. Reports are those of AsyncNotion.set_many(), with key 'values' holding the edits not written
+        """
+        self.notion = notion
+        self.max_edits = max_edits
+        self.max_delay = max_delay
+        self.on_conflict = on_conflict
+        # Page ID -> {column name: value} of waiting edits
+        self.edits = {}
+        # Page ID -> index the row was first edited by, used in reports
+        self.indices = {}
+        # Page ID -> 'last_edited_time' of row when first edited, or None if the row is not stored
+        self.expected = {}
+        self._lock = threading.Lock()
+        # Number of edits waiting
+        self._size = 0
+        # Incremented on every flush, so timers started for flushed edits do nothing
+        self._generation = 0
+        # Held while flushing on the transport's event loop - created there when first used
+        self._flushing = None
+
+    def __len__(self):
+        return self._size
+
+    def _add(self, page_id, index, column_name, value):
+        """
+        Adds an edit to the queue
+        :return: True if the queue is full and must be flushed
+        """
+        if self.notion._encoder(column_name) is None:
+            raise ValueError(f'Column "{column_name}" cannot be set')
+        with self._lock:
+            if page_id not in self.edits:
+                self.edits[page_id] = {}
+                self.indices[page_id] = index
+                with self.notion._lock:
+                    row = self.notion._row(page_id)
+                self.expected[page_id] = row['last_edited_time'] if row is not None else None
+            if column_name not in self.edits[page_id]:
+                self._size += 1
+            self.edits[page_id][column_name] = value
+            # Start timer for first waiting edit
+            if self._size == 1 and self.max_delay is not None:
+                loop = self.notion.transport.loop
+                loop.call_soon_threadsafe(loop.call_later, self.max_delay, self._flush_later, self._generation)
+            return self._size >= self.max_edits
+
+    def _flush_later(self, generation):
+        """
+        Flushes queue in the background, unless it has been flushed since the timer started
+        """
+        if generation == self._generation:
+            asyncio.ensure_future(self._flush_logged())
+
+    async def _flush_logged(self):
+        try:
+            await self._flush()
+        except Exception:
+            logger.exception('Failed to flush write queue')
+
+    async def _flush(self):
+        """
+        Sends waiting edits. Runs on the transport's event loop, one flush at a time
+        :return: List with one report per row, as returned by AsyncNotion.set_many()
+        """
+        if self._flushing is None:
+            self._flushing = asyncio.Lock()
+        async with self._flushing:
+            # Take waiting edits - edits queued from now on wait for the next flush
+            with self._lock:
+                edits, indices, expected = self.edits, self.indices, self.expected
+                self.edits, self.indices, self.expected = {}, {}, {}
+                self._size = 0
+                self._generation += 1
+            if not edits:
+                return []
+            # Encoder for each column, built once per column
+            encoders = {}
+            properties = {}
+            for page_id, values in edits.items():
+                properties[page_id] = {}
+                for column_name, value in values.items():
+                    if column_name not in encoders:
+                        encoders[column_name] = self.notion._encoder(column_name)
+                    properties[page_id][column_name] = encoders[column_name](value)
+            reports = await self.notion._write(properties, {
+                page_id: {'index': indices[page_id], 'id': page_id, 'ok': False, 'error': None, 'conflict': False}
+                for page_id in edits
+            }, expected)
+            with self._lock:
+                for report in reports:
+                    page_id = report['id']
+                    # Rows edited again while flushing expect the time this flush gave them
+                    if report['ok'] and page_id in self.expected and self.expected[page_id] == expected[page_id]:
+                        with self.notion._lock:
+                            row = self.notion._row(page_id)
+                        self.expected[page_id] = row['last_edited_time'] if row is not None else None
+            for report in reports:
+                if report['conflict']:
+                    report['values'] = edits[report['id']]
+                    logger.warning(f'Conflict updating "{report["index"]}": {report["error"]}')
+                    if self.on_conflict is not None:
+                        self.on_conflict(report)
+                elif not report['ok']:
+                    logger.warning(f'Failed to update "{report["index"]}": {report["error"]}')
+            return reports
+
+    def set(self, index, column_name, value):
+        """
+        Queues an edit of a value. Refer to Notion.set()
+        :param index: Either name or integer representing the row index
+        :param column_name: Name of column
+        :param value: New value
+        :return: Reports of the flush if the queue became full, otherwise an empty list
+        """
+        notion = self.notion
+        page_id = None
+        # Built indexes are read without waiting for the event loop
+        if type(index) is int and notion._ids is not None:
+            page_id = notion._ids[index]
+        elif type(index) is str:
+            page_id = notion._lookup(index)
+        if page_id is None:
+            page_id = notion.transport.run(notion._page_id(index))
+        if self._add(page_id, index, column_name, value):
+            return self.flush()
+        return []
+
+    def flush(self):
+        """
+        Sends waiting edits and waits for them to finish
+        :return: List with one report per row, as returned by AsyncNotion.set_many(). Conflicting rows have 'conflict'
+        set to True and their edits in 'values'
+        """
+        return self.notion.transport.run(self._flush())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.flush()
+
+
+class AsyncWriteQueue(WriteQueue):
+    """
+    Write-behind queue of edits, for AsyncNotion. Refer to WriteQueue
+    """
+
+    async def set(self, index, column_name, value):
+        """
+        Queues an edit of a value. Refer to WriteQueue.set()
+        """
+        page_id = await self.notion._page_id(index)
+        if self._add(page_id, index, column_name, value):
+            return await self.flush()
+        return []
+
+    async def flush(self):
+        """
+        Sends waiting edits. Refer to WriteQueue.flush()
+        """
+        return await self.notion.transport.call(self._flush())
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.flush()
+
+
+class Event:
+    """
+    Change to a row of a Notion database, found by AsyncNotion.poll() and passed to callbacks registered with on()
+    """
+
+    # Types of event
+    types = ('added', 'changed', 'removed')
+
+    def __init__(self, event_type, page_id, row, changes):
+        """
+        :param event_type: 'added', 'changed' or 'removed'
+        :param page_id: Page ID of row
+        :param row: Row (page object) in JSON format - as it was before being removed, otherwise as it is now
+        :param changes: Dictionary of column name -> (old value, new value) of each changed column, decoded in the same
+        way as by get(). Old values of added rows and new values of removed rows are None
+        """
+        self.type = event_type
+        self.id = page_id
+        self.row = row
+        self.changes = changes
+
+    def __repr__(self):
+        return f'Event({self.type!r}, {self.id!r}, changes={self.changes!r})'
+
+
+class Column:
+    """
+    Column of decoded values, stored as a list
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Function that gets the value from a property value object
+        """
+        self.path = path
+        self.values = []
+
+    def decode(self, item):
+        """
+        Gets value from a property value object
+        :param item: Property value object in JSON format
+        :return: Value, or None if the property is empty
+        """
+        try:
+            return self.path(item)
+        except (TypeError, IndexError):
+            return None
+
+    def append(self, value):
+        self.values.append(value)
+
+    def extend(self, values):
+        self.values.extend(values)
+
+    def __setitem__(self, position, value):
+        self.values[position] = value
+
+    def concat(self, other):
+        """
+        Appends the values of another column of the same class
+        """
+        self.values.extend(other.values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def to_list(self):
+        return list(self.values)
+
+    def state(self):
+        """
+        Gets stored values as a list of bytes, for saving to a snapshot
+        """
+        return [marshal.dumps(self.values)]
+
+    def restore(self, parts):
+        """
+        Restores stored values from bytes given by state()
+        """
+        self.values = marshal.loads(parts[0])
+
+
+class NumberColumn(Column):
+    """
+    Column of numbers with a mask marking empty values. Numbers are stored as 64-bit integers while every value is an
+    integer, as doubles while every value is a float, and as a list once a column mixes both or holds an integer
+    beyond 64 bits - numbers are always returned exactly as they were given by the API
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.values = array('q')
+        # 1 where value is set, 0 where value is None
+        self.mask = bytearray()
+
+    def _fit(self, values):
+        """
+        Changes how numbers are stored, if needed for new values to be stored exactly
+        """
+        if type(self.values) is list:
+            return
+        kinds = {type(value) for value in values if value is not None}
+        if not kinds:
+            return
+        # Kind of values already set - the storage only changes from integers to doubles while no value is set
+        if any(self.mask):
+            kinds.add(int if self.values.typecode == 'q' else float)
+        if kinds == {float}:
+            if self.values.typecode == 'q':
+                self.values = array('d', bytes(8 * len(self.values)))
+        elif kinds == {int} and all(-2 ** 63 <= value < 2 ** 63 for value in values if value is not None):
+            if self.values.typecode == 'd':
+                self.values = array('q', bytes(8 * len(self.values)))
+        else:
+            self.values = list(self.values)
+
+    def append(self, value):
+        self._fit((value,))
+        self.values.append(0 if value is None else value)
+        self.mask.append(value is not None)
+
+    def extend(self, values):
+        self._fit(values)
+        self.values.extend([0 if value is None else value for value in values])
+        self.mask.extend([value is not None for value in values])
+
+    def __setitem__(self, position, value):
+        self._fit((value,))
+        self.values[position] = 0 if value is None else value
+        self.mask[position] = value is not None
+
+    def concat(self, other):
+        same = type(other.values) is not list and other.values.typecode == getattr(self.values, 'typecode', None)
+        if type(self.values) is list or same:
+            self.values.extend(other.values)
+            self.mask.extend(other.mask)
+        else:
+            self.extend(other.to_list())
+
+    def to_list(self):
+        return [value if is_set else None for value, is_set in zip(self.values, self.mask)]
+
+    def state(self):
+        if type(self.values) is list:
+            return [b'', marshal.dumps(self.values), bytes(self.mask)]
+        return [self.values.typecode.encode(), self.values.tobytes(), bytes(self.mask)]
+
+    def restore(self, parts):
+        typecode = bytes(parts[0]).decode()
+        if typecode:
+            self.values = array(typecode)
+            self.values.frombytes(parts[1])
+        else:
+            self.values = marshal.loads(parts[1])
+        self.mask = bytearray(parts[2])
+
+
+class CategoryColumn(Column):
+    """
+    Column of select/status names, stored as integer codes into a table of categories
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.values = array('H')
+        # Code 0 is reserved for empty values
+        self.categories = [None]
+        self.codes = {None: 0}
+
+    def _code(self, value):
+        """
+        Gets code of a category, adding it to the table if new
+        """
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.categories)
+            self.categories.append(value)
+            # Widen codes once they no longer fit in 16 bits
+            if code > 0xFFFF and self.values.typecode == 'H':
+                self.values = array('I', self.values)
+        return code
+
+    def append(self, value):
+        self.values.append(self._code(value))
+
+    def extend(self, values):
+        # Codes are found first, as the array of codes may be widened while finding them
+        codes = [self._code(value) for value in values]
+        self.values.extend(codes)
+
+    def __setitem__(self, position, value):
+        self.values[position] = self._code(value)
+
+    def concat(self, other):
+        # Map codes of the other column to codes of this column
+        codes = [self._code(category) for category in other.categories]
+        self.values.extend([codes[code] for code in other.values])
+
+    def to_list(self):
+        categories = self.categories
+        return [categories[code] for code in self.values]
+
+    def state(self):
+        return [self.values.typecode.encode(), self.values.tobytes(), marshal.dumps(self.categories)]
+
+    def restore(self, parts):
+        self.values = array(bytes(parts[0]).decode())
+        self.values.frombytes(parts[1])
+        self.categories = marshal.loads(parts[2])
+        self.codes = {category: code for code, category in enumerate(self.categories)}
+
+
+class Codec:
+    """
+    Decoder and encoder of one type of property, used by every method that reads or writes values of the type.
+    Decoders are given the field of a property value object named by its type, e.g. item['select'], and return
+    None for empty values instead of raising, so whole columns are decoded in a single pass.
+    Refer to https://developers.notion.com/reference/property-value-object
+    """
+
+    def __init__(self, column_type, decode, encode=None, storage=Column, items=None):
+        """
+        :param column_type: Type of property
+        :param decode: Function that gets the value from the field of a property value object
+        :param encode: Function that builds the field of a property value object from a value, or None if
+        properties of the type cannot be set
+        :param storage: Column class that stores decoded values
+        :param items: Function that gets the value from a list of property item objects, as returned by the
+        'retrieve a page property' endpoint. Default decodes the first item
+        """
+        self.type = column_type
+        self.decode = decode
+        self.encode = encode
+        self.storage = storage
+        self.items = items or self._first_item
+        # Decode path from a whole property value object, with the field bound in advance
+        self.path = lambda item, field=column_type, decode=decode: decode(item[field])
+
+    def _first_item(self, items):
+        return self.decode(items[0][self.type]) if items else None
+
+    def column(self):
+        """
+        Creates empty column of the type
+        """
+        return self.storage(self.path)
+
+    def decode_all(self, rows, column_name):
+        """
+        Decodes a column from a list of rows
+        :param rows: List of rows (page objects) in JSON format
+        :param column_name: Name of column
+        :return: List of values
+        """
+        decode = self.decode
+        field = self.type
+        try:
+            return [decode(row['properties'][column_name][field]) for row in rows]
+        except (TypeError, IndexError, KeyError):
+            # Decode again one row at a time - rows that cannot be decoded give None
+            column = self.column()
+            return [column.decode(row['properties'][column_name]) for row in rows]
+
+    def encode_property(self, value):
+        """
+        Builds property value object from a value
+        """
+        return {self.type: self.encode(value)}
+
+
+def _plain_text(rich_text):
+    # Joins every fragment of a rich text array - most hold a single fragment
+    if not rich_text:
+        return None
+    if len(rich_text) == 1:
+        return rich_text[0]['plain_text']
+    return ''.join([fragment['plain_text'] for fragment in rich_text])
+
+
+def _encode_text(value):
+    # Notion limits each fragment to 2000 characters
+    value = value or ''
+    return [{'type': 'text', 'text': {'content': value[i:i + 2000]}} for i in range(0, len(value), 2000)]
+
+
+def _text_items(items):
+    # Paginated title and rich text properties give one item per fragment
+    return ''.join([item[item['type']]['plain_text'] for item in items]) or None
+
+
+def _name(option):
+    return option['name'] if option else None
+
+
+def _encode_name(value):
+    return None if value is None else {'name': value}
+
+
+def _date(date):
+    # Date ranges are given as 'start/end', as in ISO 8601, so dates still compare by start
+    if not date:
+        return None
+    if date.get('end') is None:
+        return date['start']
+    return f'{date["start"]}/{date["end"]}'
+
+
+def _encode_date(value):
+    # Accepts 'start', 'start/end', (start, end), or date and datetime objects
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split('/', 1)
+    elif not isinstance(value, (list, tuple)):
+        value = [value]
+    value = [item.isoformat() if hasattr(item, 'isoformat') else item for item in value]
+    return {'start': value[0], 'end': value[1] if len(value) > 1 else None}
 
-    def __init__(self, database_id, name_text='Name'):
+
+def _formula(formula):
+    if formula is None:
+        return None
+    value = formula[formula['type']]
+    return _date(value) if formula['type'] == 'date' else value
+
+
+def _ids(objects):
+    return [item['id'] for item in objects] if objects is not None else None
+
+
+def _id_items(items):
+    # Paginated relation and people properties give one item per page or user
+    return [item[item['type']]['id'] for item in items]
+
+
+def _files(files):
+    return [item[item['type']]['url'] for item in files] if files is not None else None
+
+
+def _encode_files(value):
+    return [{'name': url[:100], 'type': 'external', 'external': {'url': url}} for url in value or []]
+
+
+def _rollup(rollup):
+    # Rollups of arrays give their first value, decoded by its own type
+    if rollup is None:
+        return None
+    if rollup['type'] == 'array':
+        if not rollup['array']:
+            return None
+        rollup = rollup['array'][0]
+    codec = codecs.get(rollup['type'])
+    return codec.decode(rollup[rollup['type']]) if codec is not None else None
+
+
+def _same(value):
+    return value
+
+
+def _present(values):
+    # Values that are not empty
+    return [value for value in values if value not in (None, '', [])]
+
+
+# Type of property -> codec
+codecs = {codec.type: codec for codec in [
+    Codec('title', _plain_text, _encode_text, items=_text_items),
+    Codec('rich_text', _plain_text, _encode_text, items=_text_items),
+    Codec('number', _same, _same, NumberColumn),
+    Codec('select', _name, _encode_name, CategoryColumn),
+    Codec('status', _name, _encode_name, CategoryColumn),
+    Codec('multi_select', lambda options: [option['name'] for option in options] if options is not None else None,
+          lambda value: [{'name': name} for name in value or []]),
+    Codec('date', _date, _encode_date),
+    Codec('checkbox', _same, bool),
+    Codec('url', _same, _same),
+    Codec('email', _same, _same),
+    Codec('phone_number', _same, _same),
+    Codec('formula', _formula),
+    Codec('relation', _ids, lambda value: [{'id': page_id} for page_id in value or []], items=_id_items),
+    Codec('people', _ids, lambda value: [{'object': 'user', 'id': user_id} for user_id in value or []],
+          items=_id_items),
+    Codec('files', _files, _encode_files),
+    Codec('rollup', _rollup),
+    Codec('created_time', _same),
+    Codec('last_edited_time', _same),
+    Codec('created_by', lambda user: user['id'] if user else None),
+    Codec('last_edited_by', lambda user: user['id'] if user else None),
+]}
+
+
+class Snapshot:
+    """
+    Binary snapshot of a database on disk, so data can be read at startup without downloading the database.
+    The file holds a JSON header followed by sections of bytes: the ordered IDs, the decoded columns and the rows.
+    Opening a snapshot only reads the header, IDs and columns. Columns are restored on first use, and rows are only
+    read when they are needed, e.g. to write or refresh.
+    Sections are stored with marshal - only open snapshots written by this client.
+    """
+
+    magic = b'NOTION03'
+
+    def __init__(self, path):
+        """
+        Opens snapshot
+        :param path: Path to snapshot file
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            # Used to check that file has not been replaced before rows are read
+            self.stat = os.fstat(f.fileno())
+            if f.read(len(self.magic)) != self.magic:
+                raise ValueError(f'"{path}" is not a snapshot')
+            length = int.from_bytes(f.read(4), 'little')
+            self.header = json.loads(f.read(length))
+            self.start = f.tell()
+            # Read every section before rows
+            self.buffer = memoryview(f.read(self.header['rows'][0]))
+
+    def _section(self, section):
+        offset, length = section
+        return self.buffer[offset:offset + length]
+
+    def ids(self):
+        """
+        Gets ordered list of IDs
+        """
+        return marshal.loads(self._section(self.header['ids']))
+
+    def column(self, column_name):
+        """
+        Restores decoded column
+        :param column_name: Name of column
+        :return: Column, or None if column is not in snapshot
+        """
+        if column_name not in self.header['columns']:
+            return None
+        column = AsyncNotion._new_column(self.header['schema'][column_name]['type'])
+        column.restore([self._section(section) for section in self.header['columns'][column_name]])
+        return column
+
+    def rows(self):
+        """
+        Reads rows
+        :return: List of rows (page objects) in JSON format, or None if file has changed since it was opened
+        """
+        with open(self.path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if (stat.st_size, stat.st_mtime_ns) != (self.stat.st_size, self.stat.st_mtime_ns):
+                return None
+            offset, length = self.header['rows']
+            f.seek(self.start + offset)
+            return marshal.loads(f.read(length))
+
+    @staticmethod
+    def write(path, notion):
+        """
+        Writes snapshot of the data of a Notion object. The file is replaced in one step once written.
+        The ID index and every column must already be built - refer to AsyncNotion.save_snapshot()
+        :param path: Path to snapshot file
+        :param notion: AsyncNotion object
+        """
+        sections = []
+        offset = 0
+
+        def add(part):
+            # Add section and return its position
+            nonlocal offset
+            sections.append(part)
+            offset += len(part)
+            return [offset - len(part), len(part)]
+
+        header = {
+            'database_id': notion.database_id,
+            'watermark': notion.watermark,
+            'schema': notion._schema,
+            'ids': add(marshal.dumps(notion._ids)),
+            'columns': {}
+        }
+        for column_name in notion._schema:
+            if column_name not in notion._columns:
+                continue
+            header['columns'][column_name] = [add(part) for part in notion._columns[column_name].state()]
+        header['rows'] = add(marshal.dumps(notion.data['results']))
+        header = json.dumps(header).encode()
+        # Write to temporary file first so an open snapshot is never left half written
+        with open(path + '.tmp', 'wb') as f:
+            f.write(Snapshot.magic)
+            f.write(len(header).to_bytes(4, 'little'))
+            f.write(header)
+            for part in sections:
+                f.write(part)
+        os.replace(path + '.tmp', path)
+
+
+class Exporter:
+    """
+    Writes rows of a database to a file a chunk at a time, so memory used does not grow with the database.
+    Each row is flattened to its ID and a value per column, decoded in the same way as by get().
+    Rows are written to a temporary file, which replaces the file once every row is written
+    """
+
+    # File extension -> format
+    extensions = {'.ndjson': 'ndjson', '.jsonl': 'ndjson', '.csv': 'csv', '.ncol': 'columnar'}
+
+    def __init__(self, path, schema):
+        """
+        :param path: Path to file
+        :param schema: Dictionary of column name -> type of column, in order of columns in the file
+        """
+        self.path = path
+        self.schema = schema
+
+    @staticmethod
+    def open(path, schema, format=None):
+        """
+        Creates exporter for a format
+        :param path: Path to file
+        :param schema: Dictionary of column name -> type of column
+        :param format: 'ndjson', 'csv' or 'columnar'. Default is taken from the extension of path
+        :return: Exporter
+        """
+        if format is None:
+            format = Exporter.extensions.get(os.path.splitext(path)[1].lower())
+        match format:
+            case 'ndjson':
+                return NdjsonExporter(path, schema)
+            case 'csv':
+                return CsvExporter(path, schema)
+            case 'columnar':
+                return ColumnarExporter(path, schema)
+        raise ValueError(f'Unknown export format for "{path}" - use one of ndjson, csv or columnar')
+
+    def write(self, ids, columns):
+        """
+        Writes a chunk of rows
+        :param ids: List of IDs of the rows
+        :param columns: Dictionary of column name -> Column holding the values of the rows
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Finishes file and moves it into place
+        """
+        self.file.close()
+        os.replace(self.path + '.tmp', self.path)
+
+    def abort(self):
+        """
+        Removes unfinished file
+        """
+        self.file.close()
+        os.remove(self.path + '.tmp')
+
+
+class NdjsonExporter(Exporter):
+    """
+    Writes each row as one line of JSON
+    """
+
+    def __init__(self, path, schema):
+        super().__init__(path, schema)
+        self.file = open(path + '.tmp', 'w', encoding='utf-8')
+
+    def write(self, ids, columns):
+        names = ['id', *columns]
+        for values in zip(ids, *[column.to_list() for column in columns.values()]):
+            self.file.write(json.dumps(dict(zip(names, values)), ensure_ascii=False))
+            self.file.write('\n')
+
+
+class CsvExporter(Exporter):
+    """
+    Writes each row as one line of CSV, with a header of column names. Lists are written as JSON, and empty
+    values as empty fields
+    """
+
+    def __init__(self, path, schema):
+        super().__init__(path, schema)
+        self.file = open(path + '.tmp', 'w', encoding='utf-8', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(['id', *schema])
+
+    def write(self, ids, columns):
+        def field(value):
+            if value is None:
+                return ''
+            if isinstance(value, (list, dict)):
+                return json.dumps(value, ensure_ascii=False)
+            return value
+
+        for values in zip(ids, *[column.to_list() for column in columns.values()]):
+            self.writer.writerow([field(value) for value in values])
+
+
+class ColumnarExporter(Exporter):
+    """
+    Writes rows in a compact columnar file, read with ColumnarFile.
+    Chunks are stored as row groups holding the sections of each column, as stored in snapshots, so numbers are
+    stored in arrays and select/status values as codes. A JSON footer gives the position of every section, so single
+    columns can be read without reading the rest of the file.
+    Sections are stored with marshal - only read files written by this client.
+    """
+
+    magic = b'NOTCOL02'
+
+    def __init__(self, path, schema):
+        super().__init__(path, schema)
+        self.file = open(path + '.tmp', 'wb')
+        self.file.write(self.magic)
+        self.offset = len(self.magic)
+        self.row_groups = []
+
+    def _add(self, part):
+        # Write section and return its position
+        self.file.write(part)
+        self.offset += len(part)
+        return [self.offset - len(part), len(part)]
+
+    def write(self, ids, columns):
+        self.row_groups.append({
+            'rows': len(ids),
+            'ids': self._add(marshal.dumps(ids)),
+            'columns': {
+                column_name: [self._add(part) for part in column.state()] for column_name, column in columns.items()
+            }
+        })
+
+    def close(self):
+        footer = json.dumps({'schema': self.schema, 'row_groups': self.row_groups}).encode()
+        self.file.write(footer)
+        self.file.write(len(footer).to_bytes(4, 'little'))
+        self.file.write(self.magic)
+        super().close()
+
+
+class ColumnarFile:
+    """
+    Columnar file written by export(). Only the footer is read on opening - columns are read when asked for
+    """
+
+    def __init__(self, path):
+        """
+        Opens columnar file
+        :param path: Path to file
+        """
+        self.path = path
+        magic = ColumnarExporter.magic
+        with open(path, 'rb') as f:
+            f.seek(-len(magic) - 4, os.SEEK_END)
+            length = int.from_bytes(f.read(4), 'little')
+            if f.read(len(magic)) != magic:
+                raise ValueError(f'"{path}" is not a columnar file')
+            f.seek(-len(magic) - 4 - length, os.SEEK_END)
+            footer = json.loads(f.read(length))
+        self.schema = footer['schema']
+        self.row_groups = footer['row_groups']
+
+    def __len__(self):
+        return sum(row_group['rows'] for row_group in self.row_groups)
+
+    def _read(self, f, section):
+        offset, length = section
+        f.seek(offset)
+        return f.read(length)
+
+    def ids(self):
+        """
+        Gets ordered list of IDs
+        """
+        ids = []
+        with open(self.path, 'rb') as f:
+            for row_group in self.row_groups:
+                ids.extend(marshal.loads(self._read(f, row_group['ids'])))
+        return ids
+
+    def column(self, column_name):
+        """
+        Reads column
+        :param column_name: Name of column
+        :return: Column as a list
+        """
+        if column_name not in self.schema:
+            raise ValueError(f'"{column_name}" is not in file')
+        values = []
+        with open(self.path, 'rb') as f:
+            for row_group in self.row_groups:
+                column = AsyncNotion._export_column(self.schema[column_name])
+                column.restore([self._read(f, section) for section in row_group['columns'][column_name]])
+                values.extend(column.to_list())
+        return values
+
+
+class AsyncNotion:
+    """
+    Asynchronous client of a Notion database. Methods that send requests are coroutines, so they can be awaited from
+    any event loop, and many databases can be queried at once with asyncio.gather(). Requests are sent by the
+    transport on its own event loop, so every client shares one connection pool and one rate limit.
+    Data is downloaded by load(), which must be awaited before the client is used.
+    """
+
+    # Base URL of the Notion API - can be pointed at a local server for testing
+    api_url = 'https://api.notion.com/v1'
+
+    # Maximum number of values cached by resolve()
+    max_cached_properties = 100000
+
+    # Maximum number of pages and blocks whose children are cached by blocks()
+    max_cached_blocks = 10000
+
+    # Number of rows in a database before its pages are decoded by worker processes, so small databases are decoded
+    # in-process
+    parallel_min_rows = 5000
+
+    # Process pools shared by all clients, by number of workers - started on first use
+    _pools = {}
+
+    # Finds 'next_cursor' of a query response without parsing it. Quotes inside values are escaped, so the key
+    # cannot appear in the text of a row
+    _cursor_pattern = re.compile(rb'"next_cursor":\s*(?:null|"([^"]*)")')
+
+    # Function computing each type of rollup from the values of the related pages, used by join_rollup()
+    # Rollups showing values give the first value, as get() does
+    rollup_functions = {
+        'show_original': lambda values: values[0] if values else None,
+        'show_unique': lambda values: values[0] if values else None,
+        'count': len,
+        'count_all': len,
+        'count_values': lambda values: len(_present(values)),
+        'count_empty': lambda values: len(values) - len(_present(values)),
+        'count_not_empty': lambda values: len(_present(values)),
+        'percent_empty': lambda values: 1 - len(_present(values)) / len(values) if values else 0,
+        'percent_not_empty': lambda values: len(_present(values)) / len(values) if values else 0,
+        'sum': lambda values: sum(_present(values)),
+        'average': lambda values: statistics.fmean(_present(values)) if _present(values) else None,
+        'median': lambda values: statistics.median(_present(values)) if _present(values) else None,
+        'min': lambda values: min(_present(values), default=None),
+        'max': lambda values: max(_present(values), default=None),
+        'earliest_date': lambda values: min(_present(values), default=None),
+        'latest_date': lambda values: max(_present(values), default=None),
+    }
+
+    def __init__(self, database_id, name_text='Name', page_size=100, stream=False, incremental=True, transport=None,
+                 cache_dir=None, revalidate=True, api_url=None, workers=None, key=None):
         """
-        Gets data on initialization
+        Sends no requests - await load() to get data
         :param database_id: Notion database ID. Refer to https://developers.notion.com/docs/getting-started
         :param name_text: Text used as identifier for 'title' type column. Default is Name
+        :param page_size: Number of rows requested per query page. Notion allows at most 100
+        :param stream: If True, only the first page is kept in self.data and columns are read by streaming the
+        database page by page, so the whole database is never held in memory
+        :param incremental: If True, refresh() only downloads rows edited since the last sync
+        :param transport: Transport used to send requests. Default is the transport shared by all Notion objects
+        :param cache_dir: Directory to keep a snapshot of the database in. If a snapshot exists, data is read from it
+        on initialization instead of downloading the database. Not used in stream mode
+        :param revalidate: If True, a snapshot opened on initialization is refreshed in the background by load().
+        Otherwise call revalidate() when required
+        :param api_url: Base URL of the Notion API. Default is AsyncNotion.api_url
+        :param workers: Number of processes that parse and decode pages in stream mode, used by get() and export() for
+        databases of at least parallel_min_rows rows. Default decodes pages in-process. Workers only help with spare
+        cores
+        :param key: Key of the Notion integration. Default is the NOTION_KEY environment variable, or key in
+        notion_key.py. Only needed once requests are sent
         """
+        if api_url is not None:
+            self.api_url = api_url
+        self.workers = workers
         # Initialize text for Name column
         self.name_text = name_text
-        # Initialize URL and authorization headers
-        self.URL = f'https://api.notion.com/v1/databases/{database_id}/query'
+        # Initialize query settings
+        self.page_size = page_size
+        self.stream = stream
+        self.incremental = incremental
+        # Default transport is started when the first request is sent
+        self._transport = transport
+        # Initialize data - loaded from snapshot when first used if opened from one
+        self._data = None
+        self._snapshot = None
+        self._schema = {}
+        # Held while data is being changed, so it can be refreshed in the background
+        self._lock = threading.RLock()
+        # Initialize row store - maps page ID to position in self.data['results']
+        self._positions = {}
+        # Most recent 'last_edited_time' seen - rows edited on or after this are downloaded by incremental refresh
+        self.watermark = None
+        # Initialize lookup indexes
+        self._invalidate()
+        # (page ID, property ID, last edited time) -> value, in order of use
+        self._property_cache = OrderedDict()
+        # Database object, with the configuration of each column - fetched on first use by join()
+        self._database = None
+        # Database ID -> AsyncNotion of related database, loaded on first use by join()
+        self._tables = {}
+        # Page or block ID -> (last edited time, child blocks), in order of use
+        self._block_cache = OrderedDict()
+        # Event type -> functions called by watch() with each event
+        self._callbacks = {event_type: [] for event_type in Event.types}
+        # Set by stop() to end watch()
+        self._watching = False
+        # Number of rows found by the last stream of the whole database, used to choose whether workers decode pages
+        self._streamed_rows = None
+        # Initialize URL - authorization headers are built when the first request is sent
+        self.URL = f'{self.api_url}/databases/{database_id}/query'
         self.database_id = database_id
-        self.headers = {
-            'Authorization': f'Bearer {key}',
-            'Notion-Version': '2022-06-28',
-            'Content-Type': 'application/json'
-        }
-        print('Connecting...')
-        # Send POST to server
-        response = requests.post(self.URL, headers=self.headers)
-        print(f'Connected to {self.URL}')
-        print('Database downloaded.\n')
-        # Format response as JSON
-        self.data = response.json()
+        self.key = key
+        self._headers = None
+        # Open snapshot if one exists
+        self.cache_path = None
+        if cache_dir is not None and not stream:
+            self.cache_path = os.path.join(cache_dir, f'{database_id}.snapshot')
+            try:
+                self._open_snapshot(Snapshot(self.cache_path))
+            except (OSError, ValueError):
+                pass
+        self._revalidate = revalidate
+        # Background refresh started by load() - kept so the task is not garbage collected
+        self._revalidation = None
+
+    @property
+    def transport(self):
+        """
+        Transport used to send requests - the transport shared by all Notion objects unless one was given
+        """
+        if self._transport is None:
+            self._transport = Transport.shared()
+        return self._transport
+
+    @property
+    def headers(self):
+        """
+        Headers of requests, authorized with the key of the Notion integration
+        """
+        if self._headers is None:
+            key = self.key or _find_key()
+            if key is None:
+                raise ValueError('No Notion key - pass key, set the NOTION_KEY environment variable or add notion_key.py')
+            self._headers = {
+                'Authorization': f'Bearer {key}',
+                'Notion-Version': '2022-06-28',
+                'Content-Type': 'application/json'
+            }
+        return self._headers
+
+    async def load(self):
+        """
+        Downloads the database, unless it was opened from a snapshot
+        :return: AsyncNotion, so it can be created and loaded in one line
+        """
+        if self._snapshot is not None:
+            logger.info(f'Database loaded from {self.cache_path}')
+            if self._revalidate:
+                self._revalidation = asyncio.ensure_future(self.revalidate())
+            return self
+        logger.info(f'Connecting to {self.URL}')
+        # Download database
+        await self.refresh()
+        logger.info('Database downloaded')
+        if self.cache_path is not None:
+            await self.save_snapshot()
+        return self
+
+    @property
+    def data(self):
+        """
+        Data from Notion database in JSON format. If opened from a snapshot, rows are read from it when first used
+        """
+        if self._data is None and self._snapshot is not None:
+            with self._lock:
+                if self._data is None:
+                    self._load_rows()
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self._data = data
+
+    def _open_snapshot(self, snapshot):
+        """
+        Serves data from a snapshot until its rows are needed
+        """
+        self._snapshot = snapshot
+        self._schema = snapshot.header['schema']
+        self.watermark = snapshot.header['watermark']
+        self._invalidate()
+        self._ids = snapshot.ids()
+
+    def _load_rows(self):
+        """
+        Reads rows from the open snapshot. If the snapshot has been replaced, e.g. by another client, the new
+        snapshot is read instead - revalidate() brings it up to date
+        """
+        snapshot, self._snapshot = self._snapshot, None
+        rows = snapshot.rows()
+        if rows is None:
+            snapshot = Snapshot(snapshot.path)
+            self._open_snapshot(snapshot)
+            self._snapshot = None
+            rows = snapshot.rows()
+        self._data = {'object': 'list', 'results': rows, 'next_cursor': None, 'has_more': False}
+        self._positions = {row['id']: position for position, row in enumerate(rows)}
+
+    async def revalidate(self):
+        """
+        Refreshes data and saves it to the snapshot
+        :return: Data from Notion database in JSON format
+        """
+        await self.refresh()
+        if self.cache_path is not None:
+            await self.save_snapshot()
+        return self.data
 
-    def refresh(self):
+    async def save_snapshot(self, path=None):
         """
-        Function to refresh data with most recent changes
+        Saves data to a snapshot, which can be opened much faster than downloading the database
+        :param path: Path to snapshot file. Default is the snapshot in cache_dir
+        """
+        # Build ID index and every column stored in the snapshot - rollups are not stored in the rows
+        await self.id_all()
+        for column_name, item in self._schema.items():
+            if item['type'] not in ('rollup', 'relation'):
+                await self.get(column_name)
+        with self._lock:
+            Snapshot.write(path or self.cache_path, self)
+
+    async def refresh(self, full=False):
+        """
+        Function to refresh data with most recent changes. Follows pagination so every row is downloaded.
+        In incremental mode, only rows edited since the last sync are downloaded and merged into the stored rows.
+        In stream mode only the first page is kept.
+        Note that incremental refreshes cannot see rows deleted by other clients - use full=True to pick those up.
+        :param full: If True, download the whole database even in incremental mode
         :return: Data from Notion database in JSON format
         """
-        # Send POST to server
-        response = requests.post(self.URL, headers=self.headers)
-        # Format response as JSON
-        self.data = response.json()
+        # Only download changed rows if database has already been downloaded
+        if self.incremental and not self.stream and not full and self.watermark is not None:
+            await self._merge_changed()
+            return self.data
+        pages = self.query()
+        # Keep first page as base of data - holds 'object', 'type' etc. keys of the response. Columns are read from the
+        # database object at the same time, so they are known even if the database is empty
+        _, data = await asyncio.gather(self._load_schema(refresh=True), anext(pages))
+        if self.stream:
+            # Stop downloading after first page
+            await pages.aclose()
+        else:
+            # Merge remaining pages into first page
+            async for page in pages:
+                data['results'].extend(page['results'])
+            data['has_more'] = False
+            data['next_cursor'] = None
+        with self._lock:
+            self._snapshot = None
+            self.data = data
+            # Rebuild row store
+            self._reindex()
         return self.data
 
+    async def _merge_changed(self):
+        """
+        Downloads rows edited since the watermark and merges them into the stored rows
+        """
+        # Notion timestamps are rounded to the minute, so rows edited at the watermark are downloaded again
+        rows = [row async for row in self.rows({
+            'filter': {
+                'timestamp': 'last_edited_time',
+                'last_edited_time': {
+                    'on_or_after': self.watermark
+                }
+            }
+        })]
+        self._merge(rows, sync=True)
+
+    async def poll(self, full=False):
+        """
+        Downloads rows edited since the last sync, finds how they differ from the stored rows and merges them.
+        Edits made through this client are already stored, so they give no events. Queries do not return archived
+        rows, so removed rows are only found by a full poll.
+        :param full: If True, download the whole database, so rows removed since the last sync are found
+        :return: List of Event, in the order the rows were returned
+        """
+        if self.stream:
+            raise ValueError('Rows are not stored in stream mode, so they cannot be polled for changes')
+        body = None
+        if not full and self.watermark is not None:
+            # Notion timestamps are rounded to the minute, so rows edited at the watermark are downloaded again
+            body = {
+                'filter': {
+                    'timestamp': 'last_edited_time',
+                    'last_edited_time': {
+                        'on_or_after': self.watermark
+                    }
+                }
+            }
+        rows = [row async for row in self.rows(body)]
+        with self._lock:
+            # Rows of a snapshot are read before comparing
+            stored = self.data['results']
+            events = []
+            for row in rows:
+                old = self._row(row['id'])
+                if row.get('archived') or row.get('in_trash'):
+                    if old is not None:
+                        events.append(Event('removed', row['id'], old, self._diff(old, None)))
+                elif old is None:
+                    events.append(Event('added', row['id'], row, self._diff(None, row)))
+                else:
+                    changes = self._diff(old, row)
+                    if changes:
+                        events.append(Event('changed', row['id'], row, changes))
+            if full:
+                # Stored rows missing from the database have been removed
+                returned = {row['id'] for row in rows}
+                for row in stored:
+                    if row['id'] not in returned:
+                        events.append(Event('removed', row['id'], row, self._diff(row, None)))
+                        rows.append({'object': 'page', 'id': row['id'], 'archived': True})
+            self._merge_rows(rows, sync=True)
+        return events
+
+    def _diff(self, old, new):
+        """
+        Compares the properties of two versions of a row
+        :param old: Row before change, or None if it was added
+        :param new: Row after change, or None if it was removed
+        :return: Dictionary of column name -> (old value, new value) of each property that differs
+        """
+        old_properties = old['properties'] if old is not None else {}
+        new_properties = new['properties'] if new is not None else {}
+        changes = {}
+        for column_name in {**old_properties, **new_properties}:
+            old_item = old_properties.get(column_name)
+            new_item = new_properties.get(column_name)
+            if old_item == new_item:
+                continue
+            item = new_item or old_item
+            column = self._export_column(item['type'])
+            changes[column_name] = (
+                None if old_item is None else column.decode(old_item),
+                None if new_item is None else column.decode(new_item)
+            )
+        return changes
+
+    def on(self, event_type, callback):
+        """
+        Registers a function called by watch() with each event of a type
+        :param event_type: 'added', 'changed' or 'removed'
+        :param callback: Function called with the Event. Coroutine functions are awaited
+        """
+        if event_type not in self._callbacks:
+            raise ValueError(f'Unknown event type "{event_type}" - expected one of {", ".join(Event.types)}')
+        self._callbacks[event_type].append(callback)
+
+    async def watch(self, min_interval=1.0, max_interval=30.0, full_interval=600.0):
+        """
+        Polls the database for changes until stop() is called, calling the functions registered with on() for each
+        event. Polls are sent every min_interval seconds while rows are changing, and the interval doubles up to
+        max_interval while nothing changes, so requests are sent in proportion to the rate of change.
+        Refer to poll()
+        :param min_interval: Seconds between polls after a change
+        :param max_interval: Longest number of seconds between polls
+        :param full_interval: Seconds between full polls, which find removed rows but download the whole database.
+        None never sends full polls
+        """
+        self._watching = True
+        interval = min_interval
+        last_full = time.monotonic()
+        while self._watching:
+            full = full_interval is not None and time.monotonic() - last_full >= full_interval
+            events = await self.poll(full)
+            if full:
+                last_full = time.monotonic()
+            for event in events:
+                await self._dispatch(event)
+            interval = self._next_interval(interval, events, min_interval, max_interval)
+            await asyncio.sleep(interval)
+
+    async def _dispatch(self, event):
+        """
+        Calls the functions registered for an event. Errors are logged so watching continues
+        """
+        for callback in self._callbacks[event.type]:
+            try:
+                result = callback(event)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception:
+                logger.exception(f'Callback for {event.type} event of {event.id} failed')
+
+    @staticmethod
+    def _next_interval(interval, events, min_interval, max_interval):
+        """
+        Gets seconds until the next poll - polls are sent often while rows are changing, and less often otherwise
+        """
+        if events:
+            return min_interval
+        return min(interval * 2, max_interval)
+
+    def stop(self):
+        """
+        Stops watch() after its current poll or wait
+        """
+        self._watching = False
+
+    def _reindex(self, sync=True):
+        """
+        Rebuilds row store and watermark from self.data
+        :param sync: If False, keep the watermark - self.data holds rows that did not come from a query
+        """
+        self._invalidate()
+        self._positions = {}
+        if sync:
+            self.watermark = None
+        for position, row in enumerate(self.data['results']):
+            self._positions[row['id']] = position
+            if sync and (self.watermark is None or row['last_edited_time'] > self.watermark):
+                self.watermark = row['last_edited_time']
+
+    def _merge(self, rows, sync=False):
+        """
+        Merges updated rows into self.data, e.g. from an incremental query or PATCH responses.
+        Existing rows are replaced in place, new rows are appended and archived rows are removed.
+        Only query results move the watermark - a write response is newer than edits made by other clients since the
+        last sync, which would then never be downloaded.
+        :param rows: Iterable of page objects in JSON format
+        :param sync: True if rows are the results of a query for every row edited since the watermark
+        """
+        with self._lock:
+            self._merge_rows(rows, sync)
+
+    def _merge_rows(self, rows, sync=False):
+        """
+        Merges updated rows into self.data - refer to _merge()
+        """
+        # Rows are not stored in stream mode - indexes are rebuilt from the stream on next use
+        if self.stream:
+            self._invalidate()
+            return
+        results = self.data['results']
+        removed = False
+        changed = False
+        for row in rows:
+            # Skip error responses
+            if row.get('object') != 'page':
+                continue
+            position = self._positions.get(row['id'])
+            if row.get('archived') or row.get('in_trash'):
+                # Mark archived row for removal
+                if position is not None:
+                    results[position] = None
+                    del self._positions[row['id']]
+                    removed = True
+                continue
+            changed = True
+            if position is None:
+                self._positions[row['id']] = len(results)
+                results.append(row)
+                # Add new row to indexes
+                if self._ids is not None:
+                    self._ids.append(row['id'])
+                if self._titles is not None:
+                    self._titles.setdefault(self._title(row), row['id'])
+                for column_name, column in self._columns.items():
+                    column.append(column.decode(row['properties'][column_name]))
+            else:
+                # Title index is rebuilt if the title of an existing row changed
+                if self._titles is not None and self._title(row) != self._title(results[position]):
+                    self._titles = None
+                results[position] = row
+                for column_name, column in self._columns.items():
+                    column[position] = column.decode(row['properties'][column_name])
+            # Move watermark forward
+            if sync and (self.watermark is None or row['last_edited_time'] > self.watermark):
+                self.watermark = row['last_edited_time']
+        # Remove archived rows - positions of later rows change so store is rebuilt
+        if removed:
+            self.data['results'] = [row for row in results if row is not None]
+            self._reindex(sync=False)
+        # Column values may have changed
+        elif changed:
+            self._value_indexes = {}
+
+    def _invalidate(self):
+        """
+        Clears lookup indexes. They are rebuilt on demand from the current data
+        """
+        # Position -> page ID
+        self._ids = None
+        # Title -> page ID
+        self._titles = None
+        # Column name -> {value: [positions]}
+        self._value_indexes = {}
+        # Column name -> decoded column
+        self._columns = {}
+
+    def _column_type(self, column_name):
+        """
+        Gets type of column
+        """
+        return self._schema[column_name]['type']
+
+    def _title(self, row):
+        """
+        Gets title of a row
+        :param row: Page object in JSON format
+        :return: Plain text of title, or None if title is empty
+        """
+        # Titles of several fragments, e.g. with a bold word, are joined as when decoding the title column
+        return _plain_text(row['properties'][self.name_text]['title'])
+
+    async def _value_index(self, column_name):
+        """
+        Gets hash index of a column, built on first use
+        :param column_name: Name of column
+        :return: Dictionary mapping each value in the column to the list of row positions holding it
+        """
+        if column_name not in self._value_indexes:
+            value_index = {}
+            for position, value in enumerate(await self.get(column_name)):
+                try:
+                    value_index.setdefault(value, []).append(position)
+                except TypeError:
+                    # Unhashable values cannot be looked up
+                    pass
+            self._value_indexes[column_name] = value_index
+        return self._value_indexes[column_name]
+
+    async def query(self, body=None):
+        """
+        Async generator that sends query requests and yields each response page, following 'next_cursor' until
+        'has_more' is False. The next page is downloaded in the background while the current page is processed.
+        Refer to https://developers.notion.com/reference/post-database-query
+        :param body: Optional query body, e.g. filter and sorts
+        :return: Yields response JSON of each page
+        """
+        # Initialize query body
+        body = dict(body or {})
+        body['page_size'] = self.page_size
+        # Start download of first page
+        future = self.transport.submit('POST', self.URL, self.headers, json.dumps(body))
+        while future is not None:
+            page = await asyncio.wrap_future(future)
+            # Start download of next page before handing over the current one
+            if page.get('has_more'):
+                future = self.transport.submit(
+                    'POST', self.URL, self.headers, json.dumps({**body, 'start_cursor': page['next_cursor']})
+                )
+            else:
+                future = None
+            yield page
+
+    async def rows(self, body=None):
+        """
+        Async generator that yields every row in the database one at a time, downloading pages as required
+        :param body: Optional query body, e.g. filter and sorts
+        :return: Yields each row (page object) in JSON format
+        """
+        async for page in self.query(body):
+            for row in page['results']:
+                yield row
+
+    async def _decoded_pages(self, schema):
+        """
+        Async generator that streams the database and yields each page decoded into columns, in order.
+        Pages are downloaded unparsed. In databases of at least parallel_min_rows rows, each page is parsed and
+        decoded by a worker process while the next pages download, and decoded columns are sent back in compact form.
+        The size of the database is known from the ID index or the last stream - otherwise workers are used once
+        parallel_min_rows rows have been streamed.
+        :param schema: Dictionary of column name -> type of column
+        :return: Yields (list of IDs, dictionary of column name -> Column) of each page
+        """
+        loop = asyncio.get_running_loop()
+        # Decoded pages waiting to be yielded, in order
+        pending = deque()
+        # Size of database if known, otherwise rows streamed so far decide whether workers are used
+        size = len(self._ids) if self._ids is not None else self._streamed_rows
+        streamed = 0
+        # Rows handed over
+        count = 0
+        body = {'page_size': self.page_size}
+        future = self.transport.submit('POST', self.URL, self.headers, json.dumps(body), raw=True)
+        try:
+            while future is not None:
+                page = await asyncio.wrap_future(future)
+                # Start download of next page before decoding the current one
+                cursor = self._next_cursor(page)
+                if cursor is not None:
+                    future = self.transport.submit(
+                        'POST', self.URL, self.headers, json.dumps({**body, 'start_cursor': cursor}), raw=True
+                    )
+                else:
+                    future = None
+                if self.workers and (streamed if size is None else size) >= self.parallel_min_rows:
+                    pending.append(asyncio.ensure_future(self._decode_in_worker(page, schema)))
+                else:
+                    decoded = loop.create_future()
+                    decoded.set_result(self._decode_columns(json.loads(page), schema))
+                    pending.append(decoded)
+                streamed += self.page_size
+                # Hand over decoded pages, keeping at most two pages per worker in flight
+                while pending and (pending[0].done() or len(pending) > 2 * (self.workers or 1)):
+                    ids, columns = await pending.popleft()
+                    count += len(ids)
+                    yield ids, columns
+            while pending:
+                ids, columns = await pending.popleft()
+                count += len(ids)
+                yield ids, columns
+            self._streamed_rows = count
+        finally:
+            # Stop decoding pages that will not be used, e.g. if the generator is closed early
+            for decoded in pending:
+                decoded.cancel()
+
+    def _next_cursor(self, page):
+        """
+        Gets 'next_cursor' of an unparsed query response
+        :param page: Response body as bytes
+        :return: Cursor, or None if there are no more pages
+        """
+        # Top-level keys follow the rows, so the key is searched for from the end
+        match = self._cursor_pattern.match(page, max(page.rfind(b'"next_cursor"'), 0))
+        return match.group(1).decode() if match and match.group(1) is not None else None
+
+    def _process_pool(self):
+        """
+        Gets the process pool shared by clients with this number of workers, starting it on first use.
+        Workers are spawned rather than forked, as the transport's thread is running
+        """
+        pool = self._pools.get(self.workers)
+        if pool is None:
+            pool = futures.ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            AsyncNotion._pools[self.workers] = pool
+        return pool
+
+    async def _decode_in_worker(self, page, schema):
+        """
+        Decodes a page in a worker process
+        :return: (list of IDs, dictionary of column name -> Column)
+        """
+        loop = asyncio.get_running_loop()
+        ids, states = await loop.run_in_executor(self._process_pool(), self._decode_page, page, schema)
+        columns = {}
+        for column_name, column_type in schema.items():
+            column = self._export_column(column_type)
+            column.restore(states[column_name])
+            columns[column_name] = column
+        return ids, columns
+
+    @staticmethod
+    def _decode_page(page, schema):
+        """
+        Parses a query response and decodes its rows. Run by worker processes
+        :param page: Response body as bytes
+        :param schema: Dictionary of column name -> type of column
+        :return: (list of IDs, dictionary of column name -> state of Column), so columns are sent back compactly
+        """
+        ids, columns = AsyncNotion._decode_columns(json.loads(page), schema)
+        return ids, {column_name: column.state() for column_name, column in columns.items()}
+
+    @staticmethod
+    def _decode_columns(page, schema):
+        """
+        Decodes the rows of a query response into columns
+        :param page: Response JSON
+        :param schema: Dictionary of column name -> type of column
+        :return: (list of IDs, dictionary of column name -> Column)
+        """
+        if 'results' not in page:
+            raise ValueError(f'Query failed: {page.get("message", page)}')
+        rows = page['results']
+        columns = {}
+        for column_name, column_type in schema.items():
+            column = AsyncNotion._export_column(column_type)
+            codec = codecs.get(column_type)
+            if codec is None:
+                column.extend([column.decode(row['properties'][column_name]) for row in rows])
+            else:
+                column.extend(codec.decode_all(rows, column_name))
+            columns[column_name] = column
+        return [row['id'] for row in rows], columns
+
+    async def _pages(self):
+        """
+        Async generator that yields lists of rows - the stored rows at once, or a fresh stream of pages if in stream
+        mode. Rows are handed over a page at a time so they are not each awaited
+        """
+        if self.stream:
+            async for page in self.query():
+                yield page['results']
+        else:
+            yield self.data['results']
+
     def save(self, filename):
         """
         Save self.data JSON to file
@@ -53,96 +2212,203 @@ class Notion:
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(self.data, f, ensure_ascii=False, indent=4)
 
-    @staticmethod
-    def save_dict(dictionary, filename):
+    @staticmethod
+    def save_dict(dictionary, filename):
+        """
+        Saves python dictionary to JSON file
+        """
+        # Write JSON to file
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(dictionary, f, ensure_ascii=False, indent=4)
+
+    async def export(self, path, format=None, column_names=None, chunk_size=10000):
+        """
+        Writes every row to a file, flattened to its ID and a value per column. Rows are decoded and written a chunk
+        at a time, so in stream mode the database is exported page by page using constant memory. In stream mode,
+        pages can be decoded by worker processes - refer to the workers parameter of AsyncNotion.
+        Rollups are exported as included in the rows, and relations as the IDs of the related pages included in the
+        rows - use get() to fetch them from the API instead.
+        :param path: Path to file
+        :param format: 'ndjson' (one JSON object per line), 'csv' or 'columnar' (read with ColumnarFile). Default is
+        taken from the extension of path - .ndjson or .jsonl, .csv or .ncol
+        :param column_names: List of columns to export. Default is every column
+        :param chunk_size: Number of rows decoded before they are written - rounded up to whole pages in stream mode
+        :return: Number of rows written
+        """
+        if column_names is None:
+            column_names = list(self._schema)
+        schema = {column_name: self._column_type(column_name) for column_name in column_names}
+
+        def new_columns():
+            return {column_name: self._export_column(column_type) for column_name, column_type in schema.items()}
+
+        exporter = Exporter.open(path, schema, format)
+        count = 0
+        try:
+            ids = []
+            columns = new_columns()
+            if self.stream:
+                # Pages are decoded into columns as they are streamed, and chunks written once full
+                async for page_ids, page_columns in self._decoded_pages(schema):
+                    ids.extend(page_ids)
+                    for column_name, column in columns.items():
+                        column.concat(page_columns[column_name])
+                    if len(ids) >= chunk_size:
+                        exporter.write(ids, columns)
+                        count += len(ids)
+                        ids = []
+                        columns = new_columns()
+            else:
+                for row in self.data['results']:
+                    ids.append(row['id'])
+                    properties = row['properties']
+                    for column_name, column in columns.items():
+                        column.append(column.decode(properties[column_name]))
+                    # Write full chunk and start the next
+                    if len(ids) == chunk_size:
+                        exporter.write(ids, columns)
+                        count += len(ids)
+                        ids = []
+                        columns = new_columns()
+            if ids:
+                exporter.write(ids, columns)
+                count += len(ids)
+        except BaseException:
+            exporter.abort()
+            raise
+        exporter.close()
+        logger.info(f'Exported {count} rows to {path}')
+        return count
+
+    @staticmethod
+    def _export_column(column_type):
+        """
+        Creates empty column used to export a type of column
+        :param column_type: Type of column
+        :return: Column - the column used by get(), or the raw value if get() has none
+        """
+        column = AsyncNotion._new_column(column_type)
+        if column is None:
+            return Column(lambda item: item[item['type']])
+        return column
+
+    async def id_all(self):
+        """
+        Returns ordered list of IDs
+        """
+        # Build position -> ID index on first use
+        if self._ids is None:
+            ids = []
+            async for rows in self._pages():
+                ids.extend(row['id'] for row in rows)
+            self._ids = ids
+        return list(self._ids)
+
+    async def id(self, item_name):
+        """
+        Gets ID of item
+        """
+        # Build title -> ID index on first use from title column - first occurrence of a title wins
+        if self._titles is None:
+            titles = {}
+            for title, item_id in zip(await self.get(self.name_text), await self.id_all()):
+                titles.setdefault(title, item_id)
+            self._titles = titles
+        return self._lookup(item_name)
+
+    def _lookup(self, item_name):
+        """
+        Gets ID of item from the title index, without building it
+        :return: ID, or None if the title index is not built
+        """
+        titles = self._titles
+        if titles is None:
+            return None
+        if item_name not in titles:
+            raise ValueError(f'"{item_name}" is not in list')
+        return titles[item_name]
+
+    async def get(self, column_name):
+        """
+        Function to get all data from a specified column.
+        For configuring properties, refer to https://developers.notion.com/reference/property-value-object.
+        :return: Returns column as a list
+        """
+        # Get type of column
+        column_type = self._column_type(column_name)
+        # Rollups and relations are fetched from the API
+        if column_type in ('rollup', 'relation'):
+            return (await self.resolve([column_name]))[column_name]
+        # Decode column on first use - later calls are served from the cached column
+        values = self._cached(column_name)
+        if values is not None:
+            return values
+        column = None
+        if self._snapshot is not None:
+            column = self._snapshot.column(column_name)
+        if column is None:
+            start = time.perf_counter()
+            column = await self._decode_column(column_name, column_type)
+            self.transport.metrics.record_decode(column_name, time.perf_counter() - start)
+        if column is None:
+            return None
+        self._columns[column_name] = column
+        return column.to_list()
+
+    def _cached(self, column_name):
+        """
+        Gets column from the cache, without decoding it or sending requests
+        :return: Column as a list, or None if the column is not cached
+        """
+        with self._lock:
+            column = self._columns.get(column_name)
+            return None if column is None else column.to_list()
+
+    async def _decode_column(self, column_name, column_type):
         """
-        Saves python dictionary to JSON file
+        Decodes a column from the rows in a single pass
+        :param column_name: Name of column
+        :param column_type: Type of column
+        :return: Decoded column, or None if the type of column is not supported
         """
-        # Write JSON to file
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(dictionary, f, ensure_ascii=False, indent=4)
+        codec = codecs.get(column_type)
+        if codec is None:
+            return None
+        column = codec.column()
+        if self.stream:
+            async for _, columns in self._decoded_pages({column_name: column_type}):
+                column.concat(columns[column_name])
+            return column
+        async for rows in self._pages():
+            column.extend(codec.decode_all(rows, column_name))
+        return column
 
-    def id_all(self):
+    @staticmethod
+    def _new_column(column_type):
         """
-        Returns ordered list of IDs
+        Creates empty column for a type of column. Rollups are decoded as included in the row - Notion only
+        includes the first 25 items
+        :param column_type: Type of column
+        :return: Column, or None if the type of column is not supported
         """
-        id_list = []
-        for item in self.data['results']:
-            id_list.append(item['id'])
-        return id_list
+        codec = codecs.get(column_type)
+        return None if codec is None else codec.column()
 
-    def id(self, item_name):
+    def where(self, column_name, operator, value=None):
         """
-        Gets ID of item
+        Starts a query of rows matching a condition. Refer to Query.where()
+        :return: AsyncQuery
         """
-        index = self.get(self.name_text).index(item_name)
-        return self.id_all()[index]
+        return AsyncQuery(self).where(column_name, operator, value)
 
-    def get(self, column_name):
+    def sort(self, column_name, descending=False):
         """
-        Function to get all data from a specified column.
-        For configuring properties, refer to https://developers.notion.com/reference/property-value-object.
-        :return: Returns column as a list
+        Starts a query of all rows sorted by a column. Refer to Query.sort()
+        :return: AsyncQuery
         """
-        # Get type of column
-        column_type = self.data['results'][0]['properties'][column_name]['type']
-        # Initialize list to save elements to
-        elements = []
-        # Use type to get data path
-        match column_type:
-            case 'title':
-                for element in self.data['results']:
-                    try:
-                        elements.append(element['properties'][column_name]['title'][0]['plain_text'])
-                    except (TypeError, IndexError):
-                        elements.append(None)
-                return elements
-            case 'rich_text':
-                for element in self.data['results']:
-                    try:
-                        elements.append(element['properties'][column_name]['rich_text'][0]['plain_text'])
-                    except (TypeError, IndexError):
-                        elements.append(None)
-                return elements
-            case 'number':
-                for element in self.data['results']:
-                    try:
-                        elements.append(element['properties'][column_name]['number'])
-                    except (TypeError, IndexError):
-                        elements.append(None)
-                return elements
-            case 'select':
-                for element in self.data['results']:
-                    try:
-                        elements.append(element['properties'][column_name]['select']['name'])
-                    except (TypeError, IndexError):
-                        elements.append(None)
-                return elements
-            case 'date':
-                for element in self.data['results']:
-                    try:
-                        elements.append(element['properties'][column_name]['date']['start'])
-                    except (TypeError, IndexError):
-                        elements.append(None)
-                return elements
-            case 'email':
-                for element in self.data['results']:
-                    try:
-                        elements.append(element['properties'][column_name]['email'])
-                    except (TypeError, IndexError):
-                        elements.append(None)
-                return elements
-            case 'email':
-                for element in self.data['results']:
-                    try:
-                        elements.append(element['properties'][column_name]['phone_number'])
-                    except (TypeError, IndexError):
-                        elements.append(None)
-                return elements
-            case 'rollup':
-                return self.get_rollup_column(column_name)
+        return AsyncQuery(self).sort(column_name, descending)
 
-    def index(self, index_column_name, index_value, target_column_name):
+    async def index(self, index_column_name, index_value, target_column_name):
         """
         Gets list of all indexes for a specified value
         :param index_column_name: Column being used as index
@@ -150,360 +2416,954 @@ class Notion:
         :param target_column_name: Column being searched
         :return: Returns value from target column at index
         """
-        # Gets column being used for index
-        index_column = self.get(index_column_name)
+        # In stream mode, only download rows that contain value
+        if self.stream:
+            values = await self.where(index_column_name, '==', index_value).get(target_column_name)
+            if not values:
+                logger.info(f'List does not contain any occurrences of "{index_value}".')
+                return None
+            return values
+        # Gets list of all indexes that contain value from hash index of column
+        value_index = await self._value_index(index_column_name)
         # Checks if column contains index value
-        if not index_column.__contains__(index_value):
-            print(f'List does not contain any occurrences of "{index_value}".')
+        if not value_index.get(index_value):
+            logger.info(f'List does not contain any occurrences of "{index_value}".')
             return None
-        # Gets list of all indexes that contain value
-        indices = []
-        indexed = False
-        while indexed is False:
-            # Get index
-            index = index_column.index(index_value)
-            # Append index to indices list
-            indices.append(index)
-            # Change value at index
-            index_column[index] = None
-            # Check if column contains any other occurrences of the index value
-            if not index_column.__contains__(index_value):
-                indexed = True
         # Get target column
-        target_column = self.get(target_column_name)
+        return self._index(value_index, index_value, await self.get(target_column_name))
+
+    @staticmethod
+    def _index(value_index, index_value, target_column):
+        """
+        Gets values of target column at each position holding a value - refer to index()
+        :param value_index: Hash index of column being used as index
+        :param index_value: Value in index column
+        :param target_column: Column being searched, as a list
+        :return: List of values, or None if index column does not contain value
+        """
+        indices = value_index.get(index_value)
+        if not indices:
+            return None
         # Get values at indices and return
         values = []
         for i in indices:
             values.append(target_column[i])
         return values
 
-    def set(self, index: str | int | list, column_name, value):
+    async def set(self, index: str | int | list, column_name, value):
         """
         Function to update values in Notion database.
         For general setup, refer to https://developers.notion.com/reference/patch-page.
         For configuring properties, refer to https://developers.notion.com/reference/property-value-object.
-        :param index: Either name or integer representing the row index.
+        :param index: Either name or integer representing the row index, or a list of them to set all to value.
         :param column_name: Name of column to that desired value is in
         :param value: New value to change
+        :return: Report of each row, as returned by set_many()
+        """
+        # Get list of indices to update
+        indices = index if type(index) is list else [index]
+        # Send requests to API
+        report = await self.set_many([(i, column_name, value) for i in indices])
+        for row in report:
+            if not row['ok']:
+                logger.warning(f'Failed to update "{row["index"]}": {row["error"]}')
+        return report
+
+    async def set_many(self, updates, expected=None):
+        """
+        Updates many values at once, across any number of rows and columns.
+        Updates to the same row are merged into one request, and requests are sent concurrently.
+        Updated rows are applied to self.data from the responses.
+        :param updates: Iterable of (index, column_name, value), where index is either name or integer row index
+        :param expected: Dictionary of page ID -> 'last_edited_time' the row is expected to have. Rows edited since are
+        not updated, and are reported as conflicts. Refer to _conflicts()
+        :return: List with one report per row - dictionaries with keys 'index', 'id', 'ok', 'error' and 'conflict'
+        """
+        # Encoder for each column, built once per column
+        encoders = {}
+        # Page ID -> properties to update
+        properties = {}
+        # Page ID -> report
+        reports = {}
+        # Reports of rows that could not be sent
+        failed = []
+        for index, column_name, value in updates:
+            if column_name not in encoders and column_name in self._schema:
+                encoders[column_name] = self._encoder(column_name)
+            # Get ID for index
+            try:
+                page_id = await self._page_id(index)
+            except (ValueError, IndexError):
+                failed.append({
+                    'index': index, 'id': None, 'ok': False, 'error': f'Row "{index}" not found', 'conflict': False
+                })
+                continue
+            if column_name not in self._schema:
+                failed.append({
+                    'index': index, 'id': page_id, 'ok': False, 'error': f'Column "{column_name}" not found',
+                    'conflict': False
+                })
+                continue
+            if encoders[column_name] is None:
+                failed.append({
+                    'index': index, 'id': page_id, 'ok': False, 'error': f'Column "{column_name}" cannot be set',
+                    'conflict': False
+                })
+                continue
+            # Merge update into properties of row
+            if page_id not in properties:
+                properties[page_id] = {}
+                reports[page_id] = {'index': index, 'id': page_id, 'ok': False, 'error': None, 'conflict': False}
+            properties[page_id][column_name] = encoders[column_name](value)
+        return await self._write(properties, reports, expected) + failed
+
+    async def _write(self, properties, reports, expected=None):
         """
-        if type(index) is list:
-            # Initialize lists for URLs and data
-            URL_list = []
-            data_list = []
-            # Loop through index list and get
-            for i in index:
-                # Get ID for index
-                if type(i) is int:
-                    ID = self.id(N.get(self.name_text)[i])
+        Sends one request per row to update its properties, and applies updated rows to self.data from the responses
+        :param properties: Dictionary of page ID -> property value objects to update
+        :param reports: Dictionary of page ID -> report of row, filled in from the responses
+        :param expected: Dictionary of page ID -> expected 'last_edited_time'. Refer to set_many()
+        :return: List of reports - reports of conflicting rows last
+        """
+        conflicting = []
+        # Leave out rows edited since they were expected to be
+        if expected:
+            conflicts = await self._conflicts({
+                page_id: expected[page_id] for page_id in properties if expected.get(page_id) is not None
+            })
+            for page_id, error in conflicts.items():
+                reports[page_id].update(error=error, conflict=True)
+                conflicting.append(reports[page_id])
+        # Send one request per row
+        page_ids = [page_id for page_id in properties if not reports[page_id]['conflict']]
+        responses = await self.request_urls_patch(
+            [f'{self.api_url}/pages/{page_id}' for page_id in page_ids],
+            [json.dumps({'properties': properties[page_id]}) for page_id in page_ids]
+        )
+        self._fill_reports([reports[page_id] for page_id in page_ids], responses)
+        # Apply updated rows from responses - no need to download database again
+        self._merge(responses)
+        return [reports[page_id] for page_id in page_ids] + conflicting
+
+    def queue(self, max_edits=100, max_delay=1.0, on_conflict=None):
+        """
+        Creates a write-behind queue, which coalesces edits and checks rows for conflicts before writing.
+        Refer to WriteQueue
+        :return: AsyncWriteQueue
+        """
+        return AsyncWriteQueue(self, max_edits, max_delay, on_conflict)
+
+    async def _conflicts(self, expected):
+        """
+        Finds rows edited since they had an expected 'last_edited_time'.
+        Each row is fetched, so its own 'last_edited_time' is compared, and fetched rows are merged into the stored
+        rows, so conflicting rows hold the values they were changed to.
+        Notion timestamps are rounded to the minute, so edits in the same minute as the expected time are not seen.
+        :param expected: Dictionary of page ID -> expected 'last_edited_time'
+        :return: Dictionary of page ID -> error, for each row that was edited or deleted
+        """
+        if not expected:
+            return {}
+        conflicts = {}
+        page_ids = list(expected)
+        responses = await self.request_urls([f'{self.api_url}/pages/{page_id}' for page_id in page_ids])
+        for page_id, response in zip(page_ids, responses):
+            if response.get('object') != 'page':
+                if response.get('status') == 404:
+                    conflicts[page_id] = 'Row was deleted'
                 else:
-                    ID = self.id(i)
-                # Get URL to send request to
-                URL = f'https://api.notion.com/v1/pages/{ID}'
-                # Get type of column
-                column_type = self.data['results'][0]['properties'][column_name]['type']
-                # Use type to get data path
-                match column_type:
-                    case 'number':
-                        data = json.dumps({
-                            'properties': {
-                                column_name: {
-                                    'number': value
-                                }
-                            }
-                        })
-                    case 'title':
-                        data = json.dumps({
-                            'properties': {
-                                column_name: {
-                                    "title": [
-                                        {
-                                            "type": "text",
-                                            "text": {
-                                                "content": value
-                                            }
-                                        }
-                                    ]
-                                }
-                            }
-                        })
-                    case 'rich_text':
-                        data = json.dumps({
-                            'properties': {
-                                column_name: {
-                                    'rich_text': [
-                                        {
-                                            'type': 'text',
-                                            'text': {
-                                                'content': value
-                                            }
-                                        }
-                                    ]
-                                }
-                            }
-                        })
-                    case 'select':
-                        data = json.dumps({
-                            'properties': {
-                                column_name: {
-                                    'select': {
-                                        'name': value
-                                    }
-                                }
-                            }
-                        })
-                    case 'status':
-                        data = json.dumps({
-                            'properties': {
-                                column_name: {
-                                    'status': {
-                                        'name': value
-                                    }
-                                }
-                            }
-                        })
-                    case 'date':
-                        data = json.dumps({
-                            'properties': {
-                                column_name: {
-                                    'date': {
-                                        'start': value
-                                    }
-                                }
-                            }
-                        })
-                # Add URL and data to respective lists
-                URL_list.append(URL)
-                data_list.append(data)
-            # Send requests to API and output results
-            print('Sending PATCH Request...')
-            responses = asyncio.run(self.request_urls_patch(URL_list, data_list))
-            print(f'"{column_name}" Property Updated.')
-            print('PATCH Request Processed.\n')
-            for response in responses:
-                print(json.dumps(response))
-            print('\n')
+                    conflicts[page_id] = f'Row could not be checked: {response.get("message")}'
+            elif response.get('archived') or response.get('in_trash'):
+                conflicts[page_id] = 'Row was deleted'
+            elif response['last_edited_time'] != expected[page_id]:
+                conflicts[page_id] = f'Row was edited at {response["last_edited_time"]}'
+        # Bring stored rows up to date - rows from single requests do not move the watermark
+        self._merge(responses)
+        return conflicts
 
-        else:
+    def _row(self, page_id):
+        """
+        Gets stored row. Rows of a snapshot are read first
+        :param page_id: Page ID of row
+        :return: Row (page object) in JSON format, or None if it is not stored
+        """
+        results = self.data['results']
+        position = self._positions.get(page_id)
+        if position is None:
+            return None
+        return results[position]
+
+    async def _page_id(self, index):
+        """
+        Gets ID of a row
+        :param index: Either name or integer representing the row index
+        """
+        if type(index) is int:
+            if self._ids is None:
+                await self.id_all()
+            return self._ids[index]
+        return await self.id(index)
+
+    def _encoder(self, column_name):
+        """
+        Gets function that builds the property value object of a column from a value.
+        Refer to https://developers.notion.com/reference/property-value-object
+        :param column_name: Name of column
+        :return: Encoder function, or None if the type of column cannot be set
+        """
+        codec = codecs.get(self._column_type(column_name))
+        if codec is None or codec.encode is None:
+            return None
+        return codec.encode_property
+
+    async def add(self, properties):
+        """
+        Creates new page and adds page to database. Reference https://developers.notion.com/reference/post-page
+        :param properties: Dictionary of column name -> value. Refer to add_many()
+        :return: Report of the new row, as returned by add_many()
+        """
+        report = (await self.add_many([properties]))[0]
+        if not report['ok']:
+            logger.warning(f'Failed to add row: {report["error"]}')
+        return report
+
+    async def add_many(self, rows):
+        """
+        Creates many new pages in the database at once, sending requests concurrently.
+        New rows are added to self.data from the responses.
+        :param rows: List of dictionaries of column name -> value. Values are converted using the type of their column,
+        in the same way as set(). Dictionaries are sent as they are, as property value objects
+        :return: List with one report per row - dictionaries with keys 'index' (position in rows), 'id', 'ok' and 'error'
+        """
+        # Encoder for each column, built once per column
+        encoders = {}
+        reports = []
+        bodies = []
+        failed = []
+        for index, row in enumerate(rows):
+            properties = {}
+            error = None
+            for column_name, value in row.items():
+                if column_name not in self._schema:
+                    error = f'Column "{column_name}" not found'
+                    break
+                if isinstance(value, dict):
+                    properties[column_name] = value
+                    continue
+                if column_name not in encoders:
+                    encoders[column_name] = self._encoder(column_name)
+                if encoders[column_name] is None:
+                    error = f'Column "{column_name}" cannot be set'
+                    break
+                properties[column_name] = encoders[column_name](value)
+            if error is not None:
+                failed.append({'index': index, 'id': None, 'ok': False, 'error': error})
+                continue
+            reports.append({'index': index, 'id': None, 'ok': False, 'error': None})
+            bodies.append(json.dumps({
+                'parent': {
+                    'type': 'database_id',
+                    'database_id': self.database_id
+                },
+                'properties': properties
+            }))
+        # Send requests to API
+        responses = await self.transport.call(self.transport.request_all(
+            'POST', [f'{self.api_url}/pages'] * len(bodies), self.headers, bodies
+        ))
+        self._fill_reports(reports, responses)
+        for report, response in zip(reports, responses):
+            report['id'] = response.get('id')
+        # Add new rows from responses - no need to download database again
+        self._merge(responses)
+        return sorted(reports + failed, key=lambda report: report['index'])
+
+    async def delete(self, name):
+        """
+        Archives row, using the title as an index
+        :param name: Either name or integer representing the row index
+        :return: Report of the row, as returned by delete_many()
+        """
+        report = (await self.delete_many([name]))[0]
+        if not report['ok']:
+            logger.warning(f'Failed to delete "{name}": {report["error"]}')
+        return report
+
+    async def delete_many(self, names):
+        """
+        Archives many rows at once, sending requests concurrently. Archived rows are removed from self.data
+        :param names: List of names or integer row indices
+        :return: List with one report per row, in the same order as names - dictionaries with keys 'index', 'id', 'ok'
+        and 'error'
+        """
+        reports = []
+        # Reports of rows found, in the order their requests are sent
+        found = []
+        for index in names:
+            report = {'index': index, 'id': None, 'ok': False, 'error': None}
+            reports.append(report)
             # Get ID for index
-            if type(index) is int:
-                ID = self.id(N.get(self.name_text)[index])
-            else:
-                ID = self.id(index)
-            # Get URL to send request to
-            URL = f'https://api.notion.com/v1/pages/{ID}'
-            # Get type of column
-            column_type = self.data['results'][0]['properties'][column_name]['type']
-            # Use type to get data path
-            match column_type:
-                case 'number':
-                    data = json.dumps({
-                        'properties': {
-                            column_name: {
-                                'number': value
-                            }
-                        }
-                    })
-                case 'title':
-                    data = json.dumps({
-                        'properties': {
-                            column_name: {
-                                "title": [
-                                    {
-                                        "type": "text",
-                                        "text": {
-                                            "content": value
-                                        }
-                                    }
-                                ]
-                            }
-                        }
-                    })
-                case 'rich_text':
-                    data = json.dumps({
-                        'properties': {
-                            column_name: {
-                                'rich_text': [
-                                    {
-                                        'type': 'text',
-                                        'text': {
-                                            'content': value
-                                        }
-                                    }
-                                ]
-                            }
-                        }
-                    })
-                case 'select':
-                    data = json.dumps({
-                        'properties': {
-                            column_name: {
-                                'select': {
-                                    'name': value
-                                }
-                            }
-                        }
-                    })
-                case 'status':
-                    data = json.dumps({
-                        'properties': {
-                            column_name: {
-                                'status': {
-                                    'name': value
-                                }
-                            }
-                        }
-                    })
-                case 'date':
-                    data = json.dumps({
-                        'properties': {
-                            column_name: {
-                                'date': {
-                                    'start': value
-                                }
-                            }
-                        }
-                    })
-            # Send request to API
-            print('Sending POST Request...')
-            response = requests.request("PATCH", URL, headers=self.headers, data=data)
-            print(f'"{column_name}" Property Updated.')
-            print('POST Request Processed.\n')
-            print(response.status_code)
-            print(response.text)
-            # Refresh data
-            self.refresh()
+            try:
+                report['id'] = await self._page_id(index)
+            except (ValueError, IndexError):
+                report['error'] = f'Row "{index}" not found'
+                continue
+            found.append(report)
+        # Send requests to API
+        responses = await self.request_urls_patch(
+            [f'{self.api_url}/pages/{report["id"]}' for report in found],
+            [json.dumps({'archived': True})] * len(found)
+        )
+        self._fill_reports(found, responses)
+        # Remove archived rows from stored data
+        self._merge(responses)
+        return reports
+
+    @staticmethod
+    def _fill_reports(reports, responses):
+        """
+        Marks each report as succeeded or failed from its response
+        :param reports: List of reports, in the same order as responses
+        :param responses: List of response JSON
+        """
+        for report, response in zip(reports, responses):
+            report['ok'] = response.get('object') == 'page'
+            if not report['ok']:
+                report['error'] = response.get('message', 'Unknown error')
+
+    def get_property_id(self, item_property):
+        return self._schema[item_property]['id']
+
+    async def get_rollup_column(self, column_name):
+        """
+        Gets rollup column, fetched from the API for each row. Refer to resolve()
+        :return: Returns column as a list
+        """
+        return (await self.resolve([column_name]))[column_name]
+
+    async def resolve(self, column_names):
+        """
+        Gets columns whose values have to be fetched from the API for each row - rollups, and relations with more
+        related pages than are included in the rows.
+        Requests for all columns are sent together, each row and column once, following pagination of the results.
+        Values are cached by row, column and the row's 'last_edited_time', so calling again only fetches rows edited
+        since. Note that rollups can change without their row being edited - call clear_cache() to fetch them again.
+        Refer to https://developers.notion.com/reference/retrieve-a-page-property
+        :param column_names: List of column names
+        :return: Dictionary mapping each column name to the column as a list
+        """
+        columns = {column_name: [] for column_name in column_names}
+        # (page ID, property ID, last edited time) -> list of (column name, position) waiting for value
+        missing = {}
+        position = 0
+        async for rows in self._pages():
+            with self._lock:
+                for row in rows:
+                    for column_name in column_names:
+                        item = row['properties'][column_name]
+                        values = columns[column_name]
+                        # Relations are included in the row unless they have too many items
+                        if item['type'] == 'relation' and not item.get('has_more'):
+                            values.append([relation['id'] for relation in item['relation']])
+                            continue
+                        key = (row['id'], item['id'], row['last_edited_time'])
+                        if key in self._property_cache:
+                            self._property_cache.move_to_end(key)
+                            values.append(self._property_cache[key])
+                        else:
+                            values.append(None)
+                            missing.setdefault(key, []).append((column_name, position))
+                    position += 1
+        if not missing:
+            return columns
+        # Send requests to API
+        keys = list(missing)
+        logger.info(f'Fetching {len(keys)} values of {", ".join(column_names)}')
+        responses = await self.transport.call(self.transport.map(self._fetch_property, [key[:2] for key in keys]))
+        with self._lock:
+            for key, (ok, value) in zip(keys, responses):
+                for column_name, position in missing[key]:
+                    columns[column_name][position] = value
+                # Errors are not cached so they are fetched again
+                if ok:
+                    self._property_cache[key] = value
+            # Remove least recently used values
+            while len(self._property_cache) > self.max_cached_properties:
+                self._property_cache.popitem(last=False)
+        return columns
+
+    def clear_cache(self):
+        """
+        Clears values cached by resolve(), related databases loaded by join() and blocks cached by blocks()
+        """
+        with self._lock:
+            self._property_cache.clear()
+            self._tables = {}
+            self._block_cache.clear()
+
+    async def blocks(self, indices=None, max_depth=None):
+        """
+        Async generator that yields the blocks of the content of rows, walking block trees breadth first.
+        Children of many pages and blocks are requested at once, up to the transport's max_concurrency, following
+        pagination of each. Children are cached by the 'last_edited_time' of their page or block, so unchanged
+        subtrees are read again without sending requests. Each block's 'parent' holds the ID of its page or block.
+        Refer to https://developers.notion.com/reference/get-block-children
+        :param indices: List of names or integer row indices. Default is every row
+        :param max_depth: Number of levels of blocks to yield - 1 gives the top level blocks of each page. Default is
+        every level
+        :return: Yields each block object in JSON format. Children of each page or block are yielded together and in
+        order, as their requests finish
+        """
+        async for children in self._block_lists(indices, max_depth):
+            for block in children:
+                yield block
+
+    async def _block_lists(self, indices=None, max_depth=None):
+        """
+        Async generator that yields the children of each page or block in the order of blocks(), a list at a time, so
+        blocks are not each awaited. Refer to blocks()
+        :return: Yields list of block objects in JSON format
+        """
+        # Get ID and last edited time of each page
+        if indices is None:
+            pages = [(row['id'], row['last_edited_time']) async for rows in self._pages() for row in rows]
+        else:
+            pages = []
+            for index in indices:
+                page_id = await self._page_id(index)
+                with self._lock:
+                    row = self._row(page_id)
+                pages.append((page_id, None if row is None else row['last_edited_time']))
+        # (ID, last edited time, depth) of pages and blocks whose children are waiting to be fetched, in order
+        waiting = deque((page_id, edited, 0) for page_id, edited in pages)
+        # Request task -> (ID, last edited time, depth)
+        running = {}
+        try:
+            while waiting or running:
+                # Start requests up to the concurrency limit - cached children are read at once
+                ready = []
+                while waiting and len(running) < self.transport.max_concurrency:
+                    block_id, edited, depth = waiting.popleft()
+                    with self._lock:
+                        cached = self._block_cache.get(block_id)
+                        if cached is not None and cached[0] == edited:
+                            self._block_cache.move_to_end(block_id)
+                            ready.append((depth, cached[1]))
+                            continue
+                    task = asyncio.ensure_future(self._children(block_id))
+                    running[task] = (block_id, edited, depth)
+                if running and not ready:
+                    done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        block_id, edited, depth = running.pop(task)
+                        children = task.result()
+                        if children is None:
+                            continue
+                        # Children of a block are only cached if its last edited time is known
+                        if edited is not None:
+                            with self._lock:
+                                self._block_cache[block_id] = (edited, children)
+                                while len(self._block_cache) > self.max_cached_blocks:
+                                    self._block_cache.popitem(last=False)
+                        ready.append((depth, children))
+                for depth, children in ready:
+                    for block in children:
+                        if block.get('has_children') and (max_depth is None or depth + 1 < max_depth):
+                            waiting.append((block['id'], block['last_edited_time'], depth + 1))
+                    yield children
+        finally:
+            for task in running:
+                task.cancel()
+
+    async def _children(self, block_id):
+        """
+        Gets every child block of a page or block, following pagination
+        :return: List of block objects in JSON format, or None if the request failed
+        """
+        url = f'{self.api_url}/blocks/{block_id}/children?page_size=100'
+        children = []
+        cursor = None
+        while True:
+            response = await self.transport.call(self.transport.request(
+                'GET', url if cursor is None else f'{url}&start_cursor={cursor}', self.headers
+            ))
+            if response.get('object') != 'list':
+                logger.warning(f'Failed to get children of {block_id}: {response.get("message", "Unknown error")}')
+                return None
+            children.extend(response['results'])
+            if not response.get('has_more'):
+                return children
+            cursor = response['next_cursor']
+
+    async def join(self, column_names, target_column_name=None, refresh=False):
+        """
+        Gets values of the pages related to each row. The related database is downloaded once with its query
+        endpoint and indexed by page ID, so values are joined locally instead of being fetched for each row.
+        Related databases are kept between calls - use refresh=True to download their changes first.
+        :param column_names: Name of relation column, or list of relation columns followed one after another, e.g.
+        ['Projects', 'Team'] for the teams of the projects of each row. Each column is in the database related to
+        by the column before it
+        :param target_column_name: Column of the last related database to get. Default is its title column
+        :param refresh: If True, related databases already downloaded are refreshed
+        :return: List with a list of values for each row, one per related page
+        """
+        if isinstance(column_names, str):
+            column_names = [column_names]
+        # IDs of pages related to each row - rows with too many related pages are fetched from the API
+        links = await self.get(column_names[0])
+        table = await self._related_table(column_names[0], refresh)
+        for column_name in column_names[1:]:
+            # Follow next relation from every related page
+            next_links = await table.get(column_name)
+            positions = table._positions
+            links = [
+                list(dict.fromkeys(
+                    page_id for linked in pages if linked in positions for page_id in next_links[positions[linked]]
+                ))
+                for pages in links
+            ]
+            table = await table._related_table(column_name, refresh)
+        if target_column_name is None:
+            target_column_name = next(name for name, item in table._schema.items() if item['type'] == 'title')
+        # Hash join on page ID - pages missing from the related database are skipped
+        values = await table.get(target_column_name)
+        positions = table._positions
+        return [[values[positions[page_id]] for page_id in pages if page_id in positions] for pages in links]
+
+    async def join_rollup(self, column_name, refresh=False):
+        """
+        Gets rollup column by joining the related database instead of fetching the rollup of each row. Refer to
+        join(). Gives the same values as get(). Rollups with functions not in rollup_functions are fetched with get()
+        :param column_name: Name of rollup column
+        :param refresh: If True, the related database is refreshed if already downloaded
+        :return: Returns column as a list
+        """
+        rollup = (await self._database_object())['properties'][column_name]['rollup']
+        function = self.rollup_functions.get(rollup['function'])
+        if function is None:
+            return await self.get(column_name)
+        values = await self.join(rollup['relation_property_name'], rollup['rollup_property_name'], refresh)
+        return [function(row) for row in values]
+
+    async def _database_object(self):
+        """
+        Gets database object, fetched on first use. Refer to https://developers.notion.com/reference/retrieve-a-database
+        """
+        if self._database is None:
+            database = await self.transport.call(
+                self.transport.request('GET', f'{self.api_url}/databases/{self.database_id}', self.headers)
+            )
+            if database.get('object') != 'database':
+                raise ValueError(f'Database "{self.database_id}" not found: {database.get("message")}')
+            self._database = database
+        return self._database
+
+    async def _load_schema(self, refresh=False):
+        """
+        Gets name, ID and type of each column from the database object, fetched on first use, so columns can be used
+        without downloading rows
+        :param refresh: If True, the database object is fetched again, e.g. to find new columns
+        :return: Dictionary of column name -> {'id': property ID, 'type': type of column}
+        """
+        if refresh or not self._schema:
+            if refresh:
+                self._database = None
+            properties = (await self._database_object())['properties']
+            self._schema = {
+                column_name: {'id': item['id'], 'type': item['type']} for column_name, item in properties.items()
+            }
+        return self._schema
+
+    async def _related_table(self, column_name, refresh=False):
+        """
+        Gets AsyncNotion of the database related to by a relation column, downloading it on first use
+        :param refresh: If True, the database is refreshed if already downloaded
+        """
+        database_id = (await self._database_object())['properties'][column_name]['relation']['database_id']
+        # Database IDs are given with or without dashes
+        if database_id.replace('-', '') == self.database_id.replace('-', ''):
+            return self
+        table = self._tables.get(database_id)
+        if table is None:
+            table = AsyncNotion(database_id, transport=self.transport, api_url=self.api_url, key=self.key)
+            await table.load()
+            self._tables[database_id] = table
+        elif refresh:
+            await table.refresh()
+        return table
+
+    async def _fetch_property(self, page_id, property_id):
+        """
+        Fetches property of a page, following pagination
+        :return: Tuple of whether the request succeeded and the value of the property
+        """
+        URL = f'{self.api_url}/pages/{page_id}/properties/{property_id}'
+        response = await self.transport.request('GET', URL, self.headers)
+        results = []
+        while True:
+            if response.get('object') == 'error':
+                return False, None
+            # Properties with a single value are not paginated
+            if response.get('object') == 'property_item':
+                return True, self._item_value(response)
+            results.extend(response['results'])
+            if not response.get('has_more'):
+                break
+            response = await self.transport.request(
+                'GET', f'{URL}?start_cursor={response["next_cursor"]}', self.headers
+            )
+        property_item = response.get('property_item', {})
+        if property_item.get('type') == 'rollup':
+            # Rollups of numbers, dates etc. are given in the property item rather than as results
+            if property_item['rollup'].get('type') != 'array':
+                return True, codecs['rollup'].decode(property_item['rollup'])
+            # Otherwise, first value is used - decoded by its own type
+            return True, self._item_value(results[0]) if results else None
+        # Values of paginated properties are built from every item, e.g. text fragments and related page IDs
+        codec = codecs.get(property_item.get('type'))
+        if codec is not None:
+            return True, codec.items(results)
+        return True, self._item_value(results[0]) if results else None
+
+    @staticmethod
+    def _item_value(item):
+        """
+        Gets value of a property item object. Refer to https://developers.notion.com/reference/property-item-object
+        """
+        codec = codecs.get(item['type'])
+        if codec is None:
+            return item[item['type']]
+        return codec.items([item])
+
+    async def request_urls(self, urls):
+        return await self.transport.call(self.transport.request_all('GET', urls, self.headers))
+
+    async def request_urls_patch(self, urls, data_list):
+        return await self.transport.call(self.transport.request_all('PATCH', urls, self.headers, data_list))
+
+
+class Notion:
+    """
+    Client of a Notion database - a thin wrapper around AsyncNotion that waits for each coroutine to finish.
+    Coroutines are run on the transport's event loop, so it can be used from any thread, including one already
+    running an event loop. Attributes not defined here, e.g. data, watermark and URL, are those of the AsyncNotion.
+    Data is loaded when first used, or by load() - reading settings such as URL or database_id sends no requests.
+    """
+
+    # Base URL of the Notion API - can be pointed at a local server for testing
+    api_url = AsyncNotion.api_url
+
+    # Attributes of the AsyncNotion that hold data, which is loaded before they are read
+    _data_attributes = {
+        'data', '_data', 'watermark', '_snapshot', '_schema', '_positions', '_ids', '_titles', '_columns',
+        '_value_indexes'
+    }
+
+    def __init__(self, database_id, name_text='Name', page_size=100, stream=False, incremental=True, transport=None,
+                 cache_dir=None, revalidate=True, workers=None, key=None):
+        """
+        Sends no requests - data is downloaded, or read from the snapshot, when first used or by load().
+        Refer to AsyncNotion for parameters
+        """
+        self.client = AsyncNotion(
+            database_id, name_text, page_size, stream, incremental, transport, cache_dir, revalidate, self.api_url,
+            workers, key
+        )
+        self._loaded = False
+        self._loading = threading.Lock()
+
+    def __getattr__(self, name):
+        # Only called for attributes not found on the wrapper - data is loaded before it is read, and other attributes
+        # of the client are read as they are
+        if name in ('client', '_loaded', '_loading'):
+            raise AttributeError(name)
+        if name in self._data_attributes:
+            self.load()
+        try:
+            return getattr(self.client, name)
+        except AttributeError:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'") from None
+
+    def load(self):
+        """
+        Downloads the database, or opens its snapshot, unless already loaded. Called when data is first used
+        :return: Notion, so it can be created and loaded in one line
+        """
+        if not self._loaded:
+            with self._loading:
+                if not self._loaded:
+                    self.client.transport.run(self.client.load())
+                    self._loaded = True
+        return self
+
+    def _run(self, coroutine):
+        """
+        Runs coroutine of the client and waits for its result, loading data first
+        """
+        try:
+            self.load()
+        except BaseException:
+            coroutine.close()
+            raise
+        return self.client.transport.run(coroutine)
+
+    def _iterate(self, generator):
+        """
+        Generator that yields each item of an async generator of the client. Data is not loaded first - load() before
+        iterating generators that use it
+        """
+        async def step():
+            return await anext(generator)
+
+        run = self.client.transport.run
+        try:
+            while True:
+                yield run(step())
+        except StopAsyncIteration:
+            return
+        finally:
+            run(generator.aclose())
+
+    def _load_schema(self):
+        """
+        Gets the type of each column without loading data. Refer to AsyncNotion._load_schema()
+        """
+        if self.client._schema:
+            return self.client._schema
+        return self.client.transport.run(self.client._load_schema())
+
+    def _column_type(self, column_name):
+        return self.client._column_type(column_name)
+
+    _new_column = staticmethod(AsyncNotion._new_column)
+
+    def refresh(self, full=False):
+        """
+        Refreshes data with most recent changes. Refer to AsyncNotion.refresh()
+        """
+        return self._run(self.client.refresh(full))
+
+    def revalidate(self):
+        """
+        Refreshes data and saves it to the snapshot
+        """
+        return self._run(self.client.revalidate())
+
+    def save_snapshot(self, path=None):
+        """
+        Saves data to a snapshot. Refer to AsyncNotion.save_snapshot()
+        """
+        return self._run(self.client.save_snapshot(path))
+
+    def query(self, body=None):
+        """
+        Generator that yields each response page of a query. Refer to AsyncNotion.query()
+        """
+        return self._iterate(self.client.query(body))
+
+    def rows(self, body=None):
+        """
+        Generator that yields every row in the database one at a time, downloading pages as required.
+        Pages are handed over from the event loop, and their rows are yielded on the calling thread
+        """
+        for page in self.query(body):
+            yield from page['results']
+
+    def id_all(self):
+        """
+        Returns ordered list of IDs
+        """
+        return self._run(self.client.id_all())
+
+    def id(self, item_name):
+        """
+        Gets ID of item
+        """
+        # Built indexes are read without waiting for the event loop
+        item_id = self.client._lookup(item_name)
+        if item_id is None:
+            item_id = self._run(self.client.id(item_name))
+        return item_id
+
+    def get(self, column_name):
+        """
+        Gets all data from a column. Refer to AsyncNotion.get()
+        :return: Returns column as a list
+        """
+        values = self.client._cached(column_name)
+        if values is None:
+            values = self._run(self.client.get(column_name))
+        return values
+
+    def where(self, column_name, operator, value=None):
+        """
+        Starts a query of rows matching a condition. Refer to Query.where()
+        :return: Query
+        """
+        return Query(self).where(column_name, operator, value)
+
+    def sort(self, column_name, descending=False):
+        """
+        Starts a query of all rows sorted by a column. Refer to Query.sort()
+        :return: Query
+        """
+        return Query(self).sort(column_name, descending)
+
+    def index(self, index_column_name, index_value, target_column_name):
+        """
+        Gets list of all values of a target column in rows holding a value. Refer to AsyncNotion.index()
+        """
+        value_index = self.client._value_indexes.get(index_column_name)
+        target_column = self.client._cached(target_column_name)
+        if self.client.stream or value_index is None or target_column is None:
+            return self._run(self.client.index(index_column_name, index_value, target_column_name))
+        values = self.client._index(value_index, index_value, target_column)
+        if values is None:
+            logger.info(f'List does not contain any occurrences of "{index_value}".')
+        return values
+
+    def poll(self, full=False):
+        """
+        Downloads rows edited since the last sync and finds how they changed. Refer to AsyncNotion.poll()
+        :return: List of Event
+        """
+        return self._run(self.client.poll(full))
+
+    def watch(self, min_interval=1.0, max_interval=30.0, full_interval=600.0):
+        """
+        Polls the database for changes until stop() is called, calling the functions registered with on() for each
+        event. Refer to AsyncNotion.watch().
+        Functions are called on this thread, so they can use this Notion object, e.g. to set values
+        """
+        self.client._watching = True
+        interval = min_interval
+        last_full = time.monotonic()
+        while self.client._watching:
+            full = full_interval is not None and time.monotonic() - last_full >= full_interval
+            events = self.poll(full)
+            if full:
+                last_full = time.monotonic()
+            for event in events:
+                self._dispatch(event)
+            interval = AsyncNotion._next_interval(interval, events, min_interval, max_interval)
+            time.sleep(interval)
+
+    def _dispatch(self, event):
+        """
+        Calls the functions registered for an event on this thread. Errors are logged so watching continues
+        """
+        for callback in self.client._callbacks[event.type]:
+            try:
+                result = callback(event)
+                if asyncio.iscoroutine(result):
+                    self._run(result)
+            except Exception:
+                logger.exception(f'Callback for {event.type} event of {event.id} failed')
+
+    def set(self, index: str | int | list, column_name, value):
+        """
+        Updates values in Notion database. Refer to AsyncNotion.set()
+        """
+        return self._run(self.client.set(index, column_name, value))
+
+    def set_many(self, updates, expected=None):
+        """
+        Updates many values at once. Refer to AsyncNotion.set_many()
+        """
+        return self._run(self.client.set_many(updates, expected))
+
+    def queue(self, max_edits=100, max_delay=1.0, on_conflict=None):
+        """
+        Creates a write-behind queue, which coalesces edits and checks rows for conflicts before writing.
+        Refer to WriteQueue
+        :return: WriteQueue
+        """
+        self.load()
+        return WriteQueue(self.client, max_edits, max_delay, on_conflict)
 
     def add(self, properties):
         """
-        NOT YET FUNCTIONAL
-        Creates new page and adds page to database. Reference https://developers.notion.com/reference/post-page
+        Adds new row to database. Refer to AsyncNotion.add_many()
         """
-        # Path to send request to
-        URL = f'https://api.notion.com/v1/pages/'
-        # Initialize Data to send
-        newData = {
-            'parent': {
-                "type": "database_id",
-                "database_id": self.database_id
-            },
-            'properties': properties,
-        }
-        # Format data to JSON
-        newData = json.dumps(newData)
-        # Send Request to server
-        response = requests.request("POST", URL, headers=self.headers, data=newData)
-        print(response.status_code)
-        print(response.text)
+        return self._run(self.client.add(properties))
+
+    def add_many(self, rows):
+        """
+        Adds many new rows to database at once. Refer to AsyncNotion.add_many()
+        """
+        return self._run(self.client.add_many(rows))
 
     def delete(self, name):
-        # Get ID for name
-        page_id = self.id(name)
-        # Initialize URL to send delete request to
-        URL = f'https://api.notion.com/v1/pages/{page_id}'
-        # Initialize request
-        data = json.dumps({
-            'archived': True
-        })
-        # Send request to server
-        response = requests.request("PATCH", URL, headers=self.headers, data=data)
-        print(response.status_code)
-        print(response.text)
+        """
+        Archives row, using the title as an index
+        """
+        return self._run(self.client.delete(name))
 
-    def get_property_id(self, item_property):
-        return self.data['results'][0]['properties'][item_property]['id']
+    def delete_many(self, names):
+        """
+        Archives many rows at once. Refer to AsyncNotion.delete_many()
+        """
+        return self._run(self.client.delete_many(names))
 
     def get_rollup_column(self, column_name):
-        # Get list of items
-        items = self.get(self.name_text)
-        # Get IDs for each item
-        item_ids = []
-        for item in items:
-            item_ids.append(self.id(item))
-        # Get column ID - "Property ID" in Notion terms
-        column_id = self.get_property_id(column_name)
-        # Initialize URLs for each request
-        URLs = []
-        for i in range(len(items)):
-            URLs.append(f'https://api.notion.com/v1/pages/{item_ids[i]}/properties/{column_id}')
-        # Send requests to API and output results - save first result to file
-        print('Sending GET Request...')
-        responses = asyncio.run(self.request_urls(URLs))
-        print(f'"{column_name}" Property Retrieved.')
-        print('GET Request Processed.\n')
-        for response in responses:
-            print(json.dumps(response))
-        print('\n')
-        # Get rollup column type
-        column_type = responses[-1]['results'][0]['type']
-        # Initialize list to save elements to
-        elements = []
-        # Use type to get data path
-        match column_type:
-            case 'title':
-                for element in responses:
-                    try:
-                        elements.append(element['results'][0]['title']['plain_text'])
-                    except (TypeError, IndexError):
-                        elements.append(None)
-                return elements
-            case 'rich_text':
-                for element in responses:
-                    try:
-                        elements.append(element['results'][0]['rich_text']['plain_text'])
-                    except (TypeError, IndexError):
-                        elements.append(None)
-                return elements
-            case 'number':
-                for element in responses:
-                    try:
-                        elements.append(element['results'][0]['number'])
-                    except (TypeError, IndexError):
-                        elements.append(None)
-                return elements
-            case 'select':
-                for element in responses:
-                    try:
-                        elements.append(element['results'][0]['select']['name'])
-                    except (TypeError, IndexError):
-                        elements.append(None)
-                return elements
-            case 'date':
-                for element in responses:
-                    try:
-                        elements.append(element['results'][0]['date']['start'])
-                    except (TypeError, IndexError):
-                        elements.append(None)
-                return elements
+        """
+        Gets rollup column, fetched from the API for each row. Refer to AsyncNotion.resolve()
+        """
+        return self._run(self.client.get_rollup_column(column_name))
 
-    async def request_urls(self, urls):
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-            for url in urls:
-                tasks.append(
-                    asyncio.ensure_future(
-                        self.get_url(session, url)
-                    )
-                )
-            return await asyncio.gather(*tasks)
+    def resolve(self, column_names):
+        """
+        Gets columns whose values have to be fetched from the API for each row. Refer to AsyncNotion.resolve()
+        """
+        return self._run(self.client.resolve(column_names))
+
+    def blocks(self, indices=None, max_depth=None):
+        """
+        Generator that yields the blocks of the content of rows, breadth first. Refer to AsyncNotion.blocks().
+        Children of each page or block are handed over from the event loop together, and yielded on the calling thread
+        """
+        self.load()
+        for children in self._iterate(self.client._block_lists(indices, max_depth)):
+            yield from children
 
-    async def get_url(self, session: aiohttp.ClientSession, url: str):
-        async with session.get(url, headers=self.headers) as response:
-            return await response.json()
+    def join(self, column_names, target_column_name=None, refresh=False):
+        """
+        Gets values of the pages related to each row, joined from the related database. Refer to AsyncNotion.join()
+        """
+        return self._run(self.client.join(column_names, target_column_name, refresh))
 
-    async def request_urls_patch(self, urls, data_list):
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-            for i in range(len(urls)):
-                tasks.append(
-                    asyncio.ensure_future(
-                        self.patch_url(session, urls[i], data_list[i])
-                    )
-                )
-            return await asyncio.gather(*tasks)
+    def join_rollup(self, column_name, refresh=False):
+        """
+        Gets rollup column by joining the related database. Refer to AsyncNotion.join_rollup()
+        """
+        return self._run(self.client.join_rollup(column_name, refresh))
 
-    async def patch_url(self, session: aiohttp.ClientSession, url: str, data):
-        async with session.patch(url, headers=self.headers, data=data) as response:
-            return await response.json()
+    def save(self, filename):
+        """
+        Save data JSON to file. Refer to AsyncNotion.save()
+        """
+        self.load()
+        self.client.save(filename)
+
+    @staticmethod
+    def save_dict(dictionary, filename):
+        """
+        Saves python dictionary to JSON file
+        """
+        AsyncNotion.save_dict(dictionary, filename)
+
+    def get_property_id(self, item_property):
+        """
+        Gets property ID of a column, without loading data
+        """
+        return self._load_schema()[item_property]['id']
+
+    def export(self, path, format=None, column_names=None, chunk_size=10000):
+        """
+        Writes every row to a file, a chunk at a time. Refer to AsyncNotion.export()
+        :return: Number of rows written
+        """
+        return self._run(self.client.export(path, format, column_names, chunk_size))
 
 
 if __name__ == '__main__':
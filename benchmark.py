@@ -0,0 +1,288 @@
+import gc
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+
+from Notion import AsyncNotion, Notion, Transport
+from fake_notion import FakeNotion
+
+# Benchmarks of the client against a local fake of the Notion API. Times, and memory measured with tracemalloc, are
+# compared against stored baselines so regressions are caught. Usage:
+#   python benchmark.py                        Run and compare against benchmark_baseline.json
+#   python benchmark.py --rows 1000 100000     Run on databases of other sizes
+#   python benchmark.py --update               Run and store results as the new baselines
+
+BASELINE_FILE = 'benchmark_baseline.json'
+
+# Script timing import of the client and creation of a Notion object, as a short-lived script would
+STARTUP = """
+import time
+start = time.perf_counter()
+from Notion import Notion
+imported = time.perf_counter()
+Notion('database', key='key')
+print(imported - start, time.perf_counter() - imported)
+"""
+
+# Column used for get() benchmark of each property type
+COLUMNS = {
+    'title': 'Name',
+    'rich_text': 'Text',
+    'number': 'Number',
+    'select': 'Select',
+    'status': 'Status',
+    'date': 'Date',
+    'email': 'Email',
+    'phone_number': 'Phone',
+    'formula': 'Formula',
+    'people': 'Person',
+    'relation': 'Projects',
+}
+
+
+def timed(function, repeat):
+    """
+    Times function
+    :return: Best time in seconds out of repeat runs
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def traced(function):
+    """
+    Measures memory allocated by function with tracemalloc, including allocations on the transport's thread
+    :return: (result of function, bytes still allocated when it returns, peak bytes allocated while it ran)
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = function()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current, peak
+
+
+def startup(repeat):
+    """
+    Times import and construction in a new interpreter each run - no requests are sent
+    :param repeat: Number of runs - best time is kept
+    :return: Dictionary of benchmark name -> seconds
+    """
+    best = [float('inf'), float('inf')]
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', STARTUP], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout
+        best = [min(seconds, float(measured)) for seconds, measured in zip(best, output.split())]
+    return {'startup import': best[0], 'startup construct': best[1]}
+
+
+def run(rows, repeat, latency, rate):
+    """
+    Runs every benchmark on a database
+    :param rows: Number of rows in database
+    :param repeat: Number of times each benchmark is run - best time is kept
+    :param latency: Seconds added to every response of the fake API
+    :param rate: Requests per second allowed by the fake API, or None for no limit
+    :return: Dictionary of benchmark name -> seconds
+    """
+    fake = FakeNotion(rows, latency=latency, rate=rate)
+    Notion.api_url = fake.start()
+    transport = Transport(rate=rate or 100000, burst=rate or 100000, max_concurrency=32)
+    results = {}
+
+    def construct():
+        return Notion(fake.database_id, transport=transport, incremental=False).load()
+
+    results['init'] = timed(construct, repeat)
+    N = construct()
+    names = N.get('Name')
+
+    for column_type, column_name in COLUMNS.items():
+        def decode():
+            # Clear cached columns so the column is decoded again, and cached related pages so they are fetched again
+            N._invalidate()
+            if column_type in ('relation', 'rollup'):
+                N.clear_cache()
+            N.get(column_name)
+
+        results[f'get[{column_type}]'] = timed(decode, repeat)
+        results[f'get[{column_type}] cached'] = timed(lambda: N.get(column_name), repeat)
+
+    def lookup():
+        N._invalidate()
+        for name in names:
+            N.id(name)
+
+    results['id'] = timed(lookup, repeat)
+    results['index'] = timed(lambda: N.index('Select', 'Complete', 'Name'), repeat)
+    results['index cold'] = timed(lambda: (N._invalidate(), N.index('Select', 'Complete', 'Name')), repeat)
+    bulk = list(range(min(rows, 500)))
+    results['set bulk'] = timed(lambda: N.set(bulk, 'Number', 1), repeat)
+
+    def queued():
+        # Repeated edits to each cell are coalesced into one request per row
+        with N.queue(max_edits=len(bulk) + 1, max_delay=None) as queue:
+            for value in range(5):
+                for i in bulk:
+                    queue.set(i, 'Number', value)
+
+    results['set queued'] = timed(queued, repeat)
+
+    def rollup():
+        N.clear_cache()
+        N.get_rollup_column('Rollup')
+
+    results['get_rollup_column'] = timed(rollup, repeat)
+    results['get_rollup_column cached'] = timed(lambda: N.get_rollup_column('Rollup'), repeat)
+
+    def join():
+        N.clear_cache()
+        N.join_rollup('Rollup')
+
+    results['join_rollup'] = timed(join, repeat)
+    results['join_rollup cached'] = timed(lambda: N.join_rollup('Rollup'), repeat)
+
+    # Content of the first 100 pages - three levels of blocks each
+    pages = list(range(min(rows, 100)))
+
+    def content():
+        N.clear_cache()
+        for _ in N.blocks(pages):
+            pass
+
+    results['blocks'] = timed(content, repeat)
+    results['blocks cached'] = timed(lambda: list(N.blocks(pages)), repeat)
+
+    # Stream mode decodes pages as they download - in-process, and in one worker process per core.
+    # Workers are used for databases of every size, so both sizes measure them
+    parallel_min_rows = AsyncNotion.parallel_min_rows
+    AsyncNotion.parallel_min_rows = 0
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for name, workers in (('export stream', None), ('export stream parallel', os.cpu_count())):
+                S = Notion(fake.database_id, transport=transport, stream=True, workers=workers)
+                results[name] = timed(lambda: S.export(os.path.join(directory, 'export.ncol')), repeat)
+    finally:
+        AsyncNotion.parallel_min_rows = parallel_min_rows
+
+    transport.close()
+    fake.stop()
+    return {f'{name} [{rows} rows]': seconds for name, seconds in results.items()}
+
+
+def memory(rows, latency, rate):
+    """
+    Measures memory held by the rows as JSON, and by the same columns decoded into the columnar cache without keeping
+    the rows, as in stream mode. Also measures peak memory of exporting the database in stream mode
+    :param rows: Number of rows in database
+    :param latency: Seconds added to every response of the fake API
+    :param rate: Requests per second allowed by the fake API, or None for no limit
+    :return: Dictionary of benchmark name -> bytes
+    """
+    fake = FakeNotion(rows, latency=latency, rate=rate)
+    Notion.api_url = fake.start()
+    transport = Transport(rate=rate or 100000, burst=rate or 100000, max_concurrency=32)
+    results = {}
+    # Stream mode downloads the first page on load - this also opens the connection pool before measuring
+    S = Notion(fake.database_id, transport=transport, stream=True).load()
+
+    def load():
+        return Notion(fake.database_id, transport=transport, incremental=False).load()
+
+    N, results['memory rows'], _ = traced(load)
+    del N
+
+    def decode():
+        # Relations are fetched from the API, so are not stored in the cache
+        for column_type, column_name in COLUMNS.items():
+            if column_type != 'relation':
+                S.get(column_name)
+
+    _, results['memory columns'], _ = traced(decode)
+    with tempfile.TemporaryDirectory() as directory:
+        E = Notion(fake.database_id, transport=transport, stream=True)
+        _, _, results['memory export stream peak'] = traced(lambda: E.export(os.path.join(directory, 'export.ncol')))
+
+    transport.close()
+    fake.stop()
+    return {f'{name} [{rows} rows]': size for name, size in results.items()}
+
+
+def compare(results, baselines, tolerance, unit, scale):
+    """
+    Prints results next to their baselines
+    :param results: Dictionary of benchmark name -> measurement
+    :param baselines: Dictionary of benchmark name -> baseline measurement
+    :param tolerance: Fraction larger than baseline a measurement can be before it is a regression
+    :param unit: Name of unit printed in the header
+    :param scale: Factor converting measurements to unit
+    :return: List of names of regressed benchmarks
+    """
+    regressions = []
+    print(f'{"Benchmark":<45}{unit:>12}{"Baseline":>12}{"Change":>10}')
+    for name, measured in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            print(f'{name:<45}{measured * scale:>12.2f}{"-":>12}{"-":>10}')
+            continue
+        change = measured / baseline - 1
+        print(f'{name:<45}{measured * scale:>12.2f}{baseline * scale:>12.2f}{change:>+10.0%}')
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Notion client against a local fake API')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000], help='Sizes of databases')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs of each benchmark - best time is kept')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    parser.add_argument('--rate', type=float, default=None, help='Requests per second allowed by the fake API')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='Fraction slower than baseline a benchmark can be before it is a regression')
+    parser.add_argument('--update', action='store_true', help='Store results as the new baselines')
+    args = parser.parse_args()
+
+    results = startup(args.repeat)
+    sizes = {}
+    for rows in args.rows:
+        results.update(run(rows, args.repeat, args.latency, args.rate))
+        sizes.update(memory(rows, args.latency, args.rate))
+
+    try:
+        with open(BASELINE_FILE, encoding='utf-8') as f:
+            baselines = json.load(f)
+    except FileNotFoundError:
+        baselines = {}
+
+    # Compare against baselines
+    regressions = compare(results, baselines, args.tolerance, 'Time (ms)', 1000)
+    print()
+    regressions += compare(sizes, baselines, args.tolerance, 'Size (MB)', 1 / 2 ** 20)
+
+    if args.update:
+        baselines.update(results)
+        baselines.update(sizes)
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=4)
+        print(f'\nBaselines saved to {BASELINE_FILE}')
+    elif regressions:
+        print(f'\n{len(regressions)} regression(s): {", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,509 @@
+import json
+import time
+import uuid
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Local fake of the Notion API, used to benchmark the client without a network connection or integration.
+# Implements the endpoints used by the client: database retrieve and query (pagination, filter and sorts), page
+# create, retrieve and update, page property items (pagination) and block children (pagination). Latency and rate
+# limits can be configured.
+# Rows relate to a 'projects' database, whose rows relate to a 'teams' database.
+
+# Options of select and status columns
+options = ['Not Started', 'In Progress', 'Complete']
+
+# Database ID -> column name -> ID of database related to
+relations = {
+    'projects': {'Team': 'teams'},
+}
+
+
+def page_id(number):
+    """
+    Gets ID of a synthetic page
+    """
+    return str(uuid.UUID(int=number + 1))
+
+
+def timestamp(seconds):
+    """
+    Formats time in the same way as Notion, rounded to the minute
+    """
+    return time.strftime('%Y-%m-%dT%H:%M:00.000Z', time.gmtime(seconds))
+
+
+def text(content):
+    """
+    Gets rich text array of a string
+    """
+    return [{
+        'type': 'text',
+        'text': {'content': content, 'link': None},
+        'plain_text': content,
+        'href': None
+    }]
+
+
+def option(name):
+    """
+    Gets select or status option of a name
+    """
+    return {'id': name[:4], 'name': name, 'color': 'default'} if name is not None else None
+
+
+def generate_rows(count, database_id='bench'):
+    """
+    Generates synthetic rows holding every property type in data.json, plus status and date.
+    Some rows have empty values, and every 10th row relates to more pages than Notion includes in a row.
+    :param count: Number of rows
+    :param database_id: ID of parent database
+    :return: List of rows (page objects) in JSON format
+    """
+    start = 1662950400
+    rows = []
+    for i in range(count):
+        related = 30 if i % 10 == 0 else i % 3
+        rows.append({
+            'object': 'page',
+            'id': page_id(i),
+            'created_time': timestamp(start + i * 60),
+            'last_edited_time': timestamp(start + i * 60),
+            'parent': {'type': 'database_id', 'database_id': database_id},
+            'archived': False,
+            'properties': {
+                'Name': {'id': 'title', 'type': 'title', 'title': text(f'Item {i}')},
+                'Number': {'id': 'IuKT', 'type': 'number', 'number': i % 97 if i % 7 else None},
+                'Formula': {'id': 'JI%3DW', 'type': 'formula', 'formula': {'type': 'number', 'number': i % 5}},
+                'Formula 1': {'id': '~%60II', 'type': 'formula', 'formula': {'type': 'string', 'string': f'f{i}'}},
+                'Email': {'id': 'McR%60', 'type': 'email', 'email': f'item{i}@example.com' if i % 3 else None},
+                'Phone': {'id': 'k%3DLl', 'type': 'phone_number', 'phone_number': f'555-{i:04d}' if i % 4 else None},
+                'Text': {'id': 'dKxI', 'type': 'rich_text', 'rich_text': text(f'Text {i % 50}') if i % 6 else []},
+                'Select': {'id': 'pFeW', 'type': 'select', 'select': option(options[i % 3] if i % 5 else None)},
+                'Status': {'id': 'sTaT', 'type': 'status', 'status': option(options[i % 3])},
+                'Date': {'id': 'dAtE', 'type': 'date', 'date': {'start': timestamp(start + i * 3600)[:10], 'end': None}},
+                'Projects': {
+                    'id': 'tLn%3E',
+                    'type': 'relation',
+                    'relation': [{'id': page_id(1000000 + k)} for k in range(min(related, 25))],
+                    'has_more': related > 25
+                },
+                'Person': {'id': 'vQd~', 'type': 'people', 'people': [{'object': 'user', 'id': page_id(2000000)}]},
+                'Rollup': {
+                    'id': 'hhHq',
+                    'type': 'rollup',
+                    'rollup': {
+                        'type': 'array',
+                        'array': [{'type': 'status', 'status': option(options[k % 3])} for k in range(min(related, 25))],
+                        'function': 'show_original'
+                    }
+                },
+            }
+        })
+    return rows
+
+
+def generate_projects(count=30, teams=3):
+    """
+    Generates rows of the 'projects' database, related to by the 'Projects' column. Each project relates to a team
+    """
+    return [{
+        'object': 'page',
+        'id': page_id(1000000 + k),
+        'created_time': timestamp(1662950400),
+        'last_edited_time': timestamp(1662950400),
+        'parent': {'type': 'database_id', 'database_id': 'projects'},
+        'archived': False,
+        'properties': {
+            'Name': {'id': 'title', 'type': 'title', 'title': text(f'Project {k}')},
+            'Status': {'id': 'sTaT', 'type': 'status', 'status': option(options[k % 3])},
+            'Budget': {'id': 'bUdG', 'type': 'number', 'number': k * 100},
+            'Team': {'id': 'tEaM', 'type': 'relation', 'relation': [{'id': page_id(3000000 + k % teams)}],
+                     'has_more': False},
+        }
+    } for k in range(count)]
+
+
+def generate_teams(count=3):
+    """
+    Generates rows of the 'teams' database, related to by the 'Team' column of projects
+    """
+    return [{
+        'object': 'page',
+        'id': page_id(3000000 + k),
+        'created_time': timestamp(1662950400),
+        'last_edited_time': timestamp(1662950400),
+        'parent': {'type': 'database_id', 'database_id': 'teams'},
+        'archived': False,
+        'properties': {
+            'Name': {'id': 'title', 'type': 'title', 'title': text(f'Team {k}')},
+        }
+    } for k in range(count)]
+
+
+def generate_blocks(page):
+    """
+    Generates synthetic content of a page - a heading, a paragraph and a toggle holding nested blocks.
+    Every 50th page also has 150 paragraphs, so its children are paginated.
+    :param page: Page object in JSON format
+    :return: Dictionary of parent ID -> list of child blocks
+    """
+    root = uuid.UUID(page['id'])
+
+    def block(parent, path, block_type, content, has_children=False):
+        parent_type = 'page_id' if parent == page['id'] else 'block_id'
+        return {
+            'object': 'block',
+            'id': str(uuid.uuid5(root, path)),
+            'parent': {'type': parent_type, parent_type: parent},
+            'created_time': page['created_time'],
+            'last_edited_time': page['last_edited_time'],
+            'has_children': has_children,
+            'archived': False,
+            'type': block_type,
+            block_type: {'rich_text': text(content), 'color': 'default'}
+        }
+
+    top = [
+        block(page['id'], 'heading', 'heading_1', 'Heading'),
+        block(page['id'], 'paragraph', 'paragraph', 'Paragraph'),
+        block(page['id'], 'toggle', 'toggle', 'Toggle', True),
+    ]
+    if (root.int - 1) % 50 == 0:
+        top += [block(page['id'], f'paragraph {k}', 'paragraph', f'Paragraph {k}') for k in range(150)]
+    toggle = [
+        block(top[2]['id'], 'toggle/paragraph', 'paragraph', 'Nested paragraph'),
+        block(top[2]['id'], 'toggle/list', 'bulleted_list_item', 'Nested list item', True),
+    ]
+    nested = [block(toggle[1]['id'], 'toggle/list/paragraph', 'paragraph', 'Deeply nested paragraph')]
+    return {page['id']: top, top[2]['id']: toggle, toggle[1]['id']: nested}
+
+
+def value(item):
+    """
+    Gets plain value of a property value object, used to evaluate filters and sorts
+    """
+    content = item[item['type']]
+    match item['type']:
+        case 'title' | 'rich_text':
+            return ''.join(fragment['plain_text'] for fragment in content) if content else None
+        case 'select' | 'status':
+            return content['name'] if content else None
+        case 'date':
+            return content['start'] if content else None
+        case 'formula':
+            return content[content['type']]
+    return content
+
+
+# Filter conditions - functions of value and argument
+conditions = {
+    'equals': lambda a, b: a == b,
+    'does_not_equal': lambda a, b: a != b,
+    'contains': lambda a, b: a is not None and b in a,
+    'does_not_contain': lambda a, b: a is None or b not in a,
+    'starts_with': lambda a, b: a is not None and a.startswith(b),
+    'ends_with': lambda a, b: a is not None and a.endswith(b),
+    'greater_than': lambda a, b: a is not None and a > b,
+    'less_than': lambda a, b: a is not None and a < b,
+    'greater_than_or_equal_to': lambda a, b: a is not None and a >= b,
+    'less_than_or_equal_to': lambda a, b: a is not None and a <= b,
+    'after': lambda a, b: a is not None and a > b,
+    'before': lambda a, b: a is not None and a < b,
+    'on_or_after': lambda a, b: a is not None and a >= b,
+    'on_or_before': lambda a, b: a is not None and a <= b,
+    'is_empty': lambda a, b: a in (None, '', []),
+    'is_not_empty': lambda a, b: a not in (None, '', []),
+}
+
+
+def matches(row, query_filter):
+    """
+    Checks whether a row matches a query filter. Refer to https://developers.notion.com/reference/post-database-query-filter
+    """
+    if 'and' in query_filter:
+        return all(matches(row, part) for part in query_filter['and'])
+    if 'or' in query_filter:
+        return any(matches(row, part) for part in query_filter['or'])
+    if 'timestamp' in query_filter:
+        field = query_filter['timestamp']
+        actual = row[field]
+    else:
+        field = next(key for key in query_filter if key != 'property')
+        actual = value(row['properties'][query_filter['property']])
+    (condition, argument), = query_filter[field].items()
+    return conditions[condition](actual, argument)
+
+
+class FakeNotion:
+    """
+    Fake Notion API serving a database and the databases it relates to from memory on a local port
+    """
+
+    def __init__(self, rows=1000, latency=0.0, rate=None, database_id='bench'):
+        """
+        :param rows: Number of synthetic rows, or list of rows
+        :param latency: Seconds added to every response
+        :param rate: Requests allowed per second before responding with 429, or None for no limit
+        :param database_id: ID of database
+        """
+        self.database_id = database_id
+        self.rows = generate_rows(rows, database_id) if type(rows) is int else rows
+        # Database ID -> rows
+        self.databases = {database_id: self.rows, 'projects': generate_projects(), 'teams': generate_teams()}
+        self.relations = {**relations, database_id: {'Projects': 'projects'}}
+        # Column name -> rollup configuration of main database
+        self.rollups = {
+            'Rollup': {
+                'relation_property_name': 'Projects', 'relation_property_id': 'tLn%3E',
+                'rollup_property_name': 'Status', 'rollup_property_id': 'sTaT', 'function': 'show_original'
+            }
+        }
+        self.pages = {row['id']: row for rows in self.databases.values() for row in rows}
+        # Block or page ID -> child blocks, generated when the content of a page is first requested
+        self.blocks = {}
+        self.latency = latency
+        self.rate = rate
+        self.tokens = rate or 0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        # Number of requests received, and of requests answered with 429
+        self.requests = 0
+        self.throttled = 0
+        self.server = None
+
+    def start(self):
+        """
+        Starts serving on a background thread
+        :return: Base URL of the API, to be used as Notion.api_url
+        """
+        fake = self
+
+        class Handler(FakeNotionHandler):
+            notion = fake
+
+        self.server = FakeNotionServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f'http://127.0.0.1:{self.server.server_port}/v1'
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def allow(self):
+        """
+        Counts request and checks it against the rate limit
+        :return: False if request should be answered with 429
+        """
+        with self.lock:
+            self.requests += 1
+            if self.rate is None:
+                return True
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            self.throttled += 1
+            return False
+
+    def database(self, database_id):
+        """
+        Gets database object, with the properties of its first row. Refer to https://developers.notion.com/reference/database
+        """
+        properties = {}
+        # Columns of an empty database are those of a synthetic row
+        rows = self.databases[database_id] or generate_rows(1, database_id)
+        for column_name, item in rows[0]['properties'].items():
+            match item['type']:
+                case 'relation':
+                    configuration = {
+                        'database_id': self.relations[database_id][column_name],
+                        'type': 'single_property',
+                        'single_property': {}
+                    }
+                case 'rollup':
+                    configuration = self.rollups[column_name]
+                case _:
+                    configuration = {}
+            properties[column_name] = {
+                'id': item['id'], 'name': column_name, 'type': item['type'], item['type']: configuration
+            }
+        return {'object': 'database', 'id': database_id, 'properties': properties}
+
+    def query(self, database_id, body):
+        rows = [row for row in self.databases[database_id] if not row['archived']]
+        if 'filter' in body:
+            rows = [row for row in rows if matches(row, body['filter'])]
+        # Sort by last sort first, so first sort takes priority
+        for sort in reversed(body.get('sorts', [])):
+            key = (lambda row: row[sort['timestamp']]) if 'timestamp' in sort else \
+                (lambda row: value(row['properties'][sort['property']]))
+            present = [row for row in rows if key(row) is not None]
+            present.sort(key=key, reverse=sort['direction'] == 'descending')
+            rows = present + [row for row in rows if key(row) is None]
+        start = int(body.get('start_cursor') or 0)
+        end = start + min(body.get('page_size', 100), 100)
+        return {
+            'object': 'list',
+            'results': rows[start:end],
+            'next_cursor': str(end) if end < len(rows) else None,
+            'has_more': end < len(rows),
+            'type': 'page',
+            'page': {}
+        }
+
+    def update(self, row, body):
+        for column_name, item in body.get('properties', {}).items():
+            # Fill in plain text as Notion does
+            for key in ('title', 'rich_text'):
+                if key in item:
+                    item[key] = [text(fragment['text']['content'])[0] for fragment in item[key]]
+            row['properties'].setdefault(column_name, {'id': column_name, 'type': next(iter(item))}).update(item)
+        if 'archived' in body:
+            row['archived'] = body['archived']
+        row['last_edited_time'] = timestamp(time.time())
+        return row
+
+    def create(self, body):
+        row = generate_rows(1, self.database_id)[0]
+        row['id'] = str(uuid.uuid4())
+        self.update(row, body)
+        with self.lock:
+            self.rows.append(row)
+            self.pages[row['id']] = row
+        return row
+
+    def children(self, block_id, start_cursor, page_size):
+        """
+        Gets paginated child blocks of a page or block. Refer to https://developers.notion.com/reference/get-block-children
+        :return: Response JSON, or None if the block does not exist
+        """
+        with self.lock:
+            if block_id in self.pages and block_id not in self.blocks:
+                self.blocks.update(generate_blocks(self.pages[block_id]))
+            blocks = self.blocks.get(block_id)
+        if blocks is None:
+            return None
+        start = int(start_cursor or 0)
+        end = start + min(int(page_size or 100), 100)
+        return {
+            'object': 'list',
+            'results': blocks[start:end],
+            'next_cursor': str(end) if end < len(blocks) else None,
+            'has_more': end < len(blocks),
+            'type': 'block',
+            'block': {}
+        }
+
+    def property_item(self, row, property_id, start_cursor):
+        """
+        Gets paginated property item response. Refer to https://developers.notion.com/reference/retrieve-a-page-property
+        """
+        item = next((item for item in row['properties'].values() if item['id'] == property_id), None)
+        if item is None:
+            return None
+        if item['type'] == 'relation':
+            count = 30 if item.get('has_more') else len(item['relation'])
+            items = [{'object': 'property_item', 'type': 'relation', 'relation': {'id': page_id(1000000 + k)}}
+                     for k in range(count)]
+        elif item['type'] == 'rollup':
+            items = [{'object': 'property_item', **element} for element in item['rollup']['array']]
+        elif item['type'] in ('title', 'rich_text', 'people'):
+            items = [{'object': 'property_item', 'type': item['type'], item['type']: element}
+                     for element in item[item['type']]]
+        else:
+            return {'object': 'property_item', **item}
+        start = int(start_cursor or 0)
+        end = start + 25
+        return {
+            'object': 'list',
+            'results': items[start:end],
+            'next_cursor': str(end) if end < len(items) else None,
+            'has_more': end < len(items),
+            'type': 'property_item',
+            'property_item': {
+                'id': item['id'],
+                'type': item['type'],
+                item['type']: {'type': 'array', 'array': [], 'function': 'show_original'}
+                if item['type'] == 'rollup' else {}
+            }
+        }
+
+
+class FakeNotionServer(ThreadingHTTPServer):
+    # Accept many connections at once without the client waiting to connect
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class FakeNotionHandler(BaseHTTPRequestHandler):
+    # Keep connections open between requests, as the Notion API does
+    protocol_version = 'HTTP/1.1'
+    notion = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def respond(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, header in (headers or {}).items():
+            self.send_header(name, header)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def not_found(self):
+        self.respond(404, {'object': 'error', 'status': 404, 'code': 'object_not_found', 'message': self.path})
+
+    def handle_request(self, method):
+        body = self.read_body() if method in ('POST', 'PATCH') else {}
+        if self.notion.latency:
+            time.sleep(self.notion.latency)
+        if not self.notion.allow():
+            return self.respond(429, {'object': 'error', 'status': 429, 'code': 'rate_limited',
+                                      'message': 'Rate limited'}, {'Retry-After': '1'})
+        path, _, query_string = self.path.partition('?')
+        parts = path.strip('/').split('/')[1:]
+        parameters = dict(part.split('=', 1) for part in query_string.split('&') if '=' in part)
+        match method, parts:
+            case 'GET', ['databases', database_id] if database_id in self.notion.databases:
+                self.respond(200, self.notion.database(database_id))
+            case 'POST', ['databases', database_id, 'query'] if database_id in self.notion.databases:
+                self.respond(200, self.notion.query(database_id, body))
+            case 'POST', ['pages']:
+                self.respond(200, self.notion.create(body))
+            case 'GET', ['pages', page] if page in self.notion.pages:
+                self.respond(200, self.notion.pages[page])
+            case 'PATCH', ['pages', page] if page in self.notion.pages:
+                self.respond(200, self.notion.update(self.notion.pages[page], body))
+            case 'GET', ['pages', page, 'properties', property_id] if page in self.notion.pages:
+                response = self.notion.property_item(
+                    self.notion.pages[page], property_id, parameters.get('start_cursor')
+                )
+                if response is None:
+                    return self.not_found()
+                self.respond(200, response)
+            case 'GET', ['blocks', block_id, 'children']:
+                response = self.notion.children(block_id, parameters.get('start_cursor'), parameters.get('page_size'))
+                if response is None:
+                    return self.not_found()
+                self.respond(200, response)
+            case _:
+                self.not_found()
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def do_PATCH(self):
+        self.handle_request('PATCH')
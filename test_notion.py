@@ -0,0 +1,631 @@
+import csv
+import json
+import time
+import asyncio
+import threading
+import email.utils
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from Notion import AsyncNotion, ColumnarFile, Notion, Query, Transport
+from fake_notion import FakeNotion, generate_blocks, generate_rows, text, timestamp, value
+
+# Tests of the client against a local fake of the Notion API. Run with: python -m pytest test_notion.py
+
+
+@pytest.fixture(scope='module')
+def transport():
+    """
+    Transport without a rate limit, so tests do not wait for tokens
+    """
+    transport = Transport(rate=100000, burst=100000, max_concurrency=32)
+    yield transport
+    transport.close()
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    """
+    Small fake database, served until the test ends
+    """
+    fake = FakeNotion(100)
+    monkeypatch.setattr(Notion, 'api_url', fake.start())
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture(scope='module')
+def large():
+    """
+    Fake database of more than 100 pages, shared by the tests that only read it
+    """
+    fake = FakeNotion(10500)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(Notion, 'api_url', fake.start())
+        yield fake
+    fake.stop()
+
+
+def connect(fake, transport, **kwargs):
+    """
+    Creates client of the fake database
+    """
+    return Notion(fake.database_id, transport=transport, key='test', **kwargs)
+
+
+def test_refresh_after_write_downloads_earlier_remote_edits(fake, transport):
+    N = connect(fake, transport).load()
+    # Another client edits a row after the last sync, but before this client writes
+    row = fake.rows[5]
+    row['properties']['Number']['number'] = 1000
+    row['last_edited_time'] = timestamp(time.time() - 3600)
+    N.set(0, 'Number', 1)
+    N.refresh()
+    assert N.get('Number')[5] == 1000
+    assert N.get('Number')[0] == 1
+
+
+def edit_remotely(fake, position, number):
+    """
+    Edits a row as another client would, an hour ago - after the last sync but before this client writes
+    """
+    row = fake.rows[position]
+    row['properties']['Number']['number'] = number
+    row['last_edited_time'] = timestamp(time.time() - 3600)
+
+
+def test_queue_reports_conflicts(fake, transport):
+    N = connect(fake, transport).load()
+    N.set(0, 'Number', 1)
+    edit_remotely(fake, 3, 1000)
+    queue = N.queue(max_delay=None)
+    queue.set(3, 'Number', 1)
+    queue.set(4, 'Number', 1)
+    reports = {report['index']: report for report in queue.flush()}
+    assert reports[3]['conflict'] and not reports[3]['ok']
+    assert reports[4]['ok'] and not reports[4]['conflict']
+    assert fake.rows[3]['properties']['Number']['number'] == 1000
+    assert N.get('Number')[3] == 1000
+
+
+def test_queue_reports_conflicts_of_snapshot(fake, transport, tmp_path):
+    connect(fake, transport, cache_dir=tmp_path).load()
+    # Rows are read from the snapshot when first used
+    N = connect(fake, transport, cache_dir=tmp_path, revalidate=False).load()
+    edit_remotely(fake, 3, 1000)
+    with N.queue(max_delay=None) as queue:
+        queue.set(3, 'Number', 1)
+        reports = queue.flush()
+    assert reports[0]['conflict']
+    assert fake.rows[3]['properties']['Number']['number'] == 1000
+    assert N.get('Number')[3] == 1000
+
+
+class BadGatewayHandler(BaseHTTPRequestHandler):
+    """
+    Answers every request with an HTML error page, as a proxy in front of the API can
+    """
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        body = b'<html><body>502 Bad Gateway</body></html>'
+        self.send_response(502)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_response_that_is_not_json_gives_error():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), BadGatewayHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    transport = Transport(rate=1000, burst=1000, max_retries=1, backoff=0.01)
+    try:
+        url = f'http://127.0.0.1:{server.server_port}/v1/pages/page'
+        responses = transport.run(transport.request_all('GET', [url, url], {}))
+        assert [response['object'] for response in responses] == ['error', 'error']
+        assert responses[0]['status'] == 502
+        # Retried before giving up
+        assert transport.metrics.retries == 2
+    finally:
+        transport.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_id_of_title_with_several_fragments(fake, transport):
+    N = connect(fake, transport).load()
+    N.id('Item 0')
+    # Row added by another client, with part of the title in bold
+    row = fake.create({})
+    row['properties']['Name']['title'] = text('Foo') + text('Bar')
+    N.refresh()
+    assert N.id('FooBar') == row['id']
+    assert N.get('Name')[-1] == 'FooBar'
+
+
+def test_every_row_is_downloaded_in_order(large, transport):
+    N = connect(large, transport, incremental=False).load()
+    ids = [row['id'] for row in large.rows]
+    assert [row['id'] for row in N.data['results']] == ids
+    assert N.get('Name') == [f'Item {i}' for i in range(10500)]
+    assert N.id('Item 10499') == ids[-1]
+
+
+def test_stream_keeps_one_page(large, transport):
+    N = connect(large, transport, stream=True).load()
+    assert len(N.data['results']) == 100
+    assert N.data['has_more']
+    # Columns are decoded from every page without storing the rows
+    assert N.get('Name') == [f'Item {i}' for i in range(10500)]
+    assert len(N.data['results']) == 100
+
+
+def test_rows_are_yielded_in_order(large, transport):
+    N = connect(large, transport, stream=True)
+    assert [row['id'] for row in N.rows()] == [row['id'] for row in large.rows]
+
+
+def test_requests_are_sent_at_the_transport_rate(monkeypatch):
+    fake = FakeNotion(100, rate=10)
+    monkeypatch.setattr(Notion, 'api_url', fake.start())
+    transport = Transport(rate=8, burst=8)
+    try:
+        urls = [f'{Notion.api_url}/pages/{row["id"]}' for row in fake.rows[:40]]
+        start = time.monotonic()
+        responses = transport.run(transport.request_all('GET', urls, {}))
+        elapsed = time.monotonic() - start
+        assert all(response['object'] == 'page' for response in responses)
+        # Requests after the burst are sent at the average rate, within the fake's limit
+        assert (len(urls) - transport.burst) / elapsed == pytest.approx(transport.rate, rel=0.2)
+        assert fake.throttled <= 1
+    finally:
+        transport.close()
+        fake.stop()
+
+
+def test_throttled_requests_wait_for_retry_after(monkeypatch):
+    fake = FakeNotion(100, rate=5)
+    monkeypatch.setattr(Notion, 'api_url', fake.start())
+    transport = Transport(rate=50, burst=50, backoff=0.01)
+    try:
+        urls = [f'{Notion.api_url}/pages/{row["id"]}' for row in fake.rows[:20]]
+        start = time.monotonic()
+        responses = transport.run(transport.request_all('GET', urls, {}))
+        elapsed = time.monotonic() - start
+        assert all(response['object'] == 'page' for response in responses)
+        assert fake.throttled > 0
+        assert transport.metrics.throttled == fake.throttled
+        # Retries wait for the 1 second Retry-After header, not the much shorter backoff
+        assert elapsed >= 1
+        # Rate is slowed down after being throttled
+        assert transport.current_rate < transport.rate
+    finally:
+        transport.close()
+        fake.stop()
+
+
+@pytest.mark.parametrize('column_name, operator, argument', [
+    ('Name', '==', 'Item 5'),
+    ('Name', '!=', 'Item 5'),
+    ('Name', 'contains', '9'),
+    ('Name', 'starts_with', 'Item 1'),
+    ('Name', 'ends_with', '7'),
+    ('Text', '==', 'Text 7'),
+    ('Text', 'contains', '1'),
+    ('Text', '==', None),
+    ('Text', '!=', None),
+    ('Number', '==', 3),
+    ('Number', '!=', 3),
+    ('Number', '>', 50),
+    ('Number', '<=', 10),
+    ('Number', '==', None),
+    ('Select', '==', 'Complete'),
+    ('Select', '!=', 'Complete'),
+    ('Select', '==', None),
+    ('Status', '==', 'In Progress'),
+    ('Status', '!=', 'In Progress'),
+    ('Date', '==', '2022-09-13'),
+    ('Date', '>', '2022-09-14'),
+    ('Date', '<=', '2022-09-13'),
+])
+def test_conditions_sent_to_notion_match_local_filtering(fake, transport, column_name, operator, argument):
+    N = connect(fake, transport)
+    query = N.where(column_name, operator, argument)
+    N._load_schema()
+    filters, checks = query.plan()
+    assert filters and not checks
+    check = Query.operators[operator]
+    expected = [row['id'] for row in fake.rows if check(value(row['properties'][column_name]), argument)]
+    assert expected
+    assert query.ids() == expected
+
+
+def test_conditions_checked_locally(fake, transport):
+    N = connect(fake, transport)
+    numbers = {row['id']: value(row['properties']['Number']) for row in fake.rows}
+    dates = {row['id']: value(row['properties']['Date']) for row in fake.rows}
+    # Rollups give the status of their first related page
+    rollups = {row['id']: bool(row['properties']['Rollup']['rollup']['array']) for row in fake.rows}
+    queries = [
+        (N.where('Date', '!=', '2022-09-13'), [page_id for page_id, date in dates.items() if date != '2022-09-13']),
+        (N.where('Number', lambda number: number is not None and number % 2 == 0),
+         [page_id for page_id, number in numbers.items() if number is not None and number % 2 == 0]),
+        (N.where('Rollup', '==', 'Not Started'), [page_id for page_id, related in rollups.items() if related]),
+        (N.where('Rollup', '==', None), [page_id for page_id, related in rollups.items() if not related]),
+    ]
+    for query, expected in queries:
+        N._load_schema()
+        filters, checks = query.plan()
+        assert checks and not filters
+        assert expected
+        assert query.ids() == expected
+
+
+def test_conditions_sent_and_checked_together(fake, transport):
+    N = connect(fake, transport)
+    query = N.where('Number', '>', 20).where('Date', '!=', '2022-09-13').sort('Number', descending=True)
+    N._load_schema()
+    filters, checks = query.plan()
+    assert len(filters) == 1 and len(checks) == 1
+    rows = [
+        row for row in fake.rows
+        if (value(row['properties']['Number']) or 0) > 20 and value(row['properties']['Date']) != '2022-09-13'
+    ]
+    rows.sort(key=lambda row: value(row['properties']['Number']), reverse=True)
+    assert query.ids() == [row['id'] for row in rows]
+
+
+def test_delete_many_reports_rows_in_order(fake, transport):
+    N = connect(fake, transport).load()
+    ids = N.id_all()
+    report = N.delete_many(['Item 3', 'Missing', 1, 'Item 7'])
+    assert [row['index'] for row in report] == ['Item 3', 'Missing', 1, 'Item 7']
+    assert [row['ok'] for row in report] == [True, False, True, True]
+    assert [row['id'] for row in report] == [ids[3], None, ids[1], ids[7]]
+    assert len(N.data['results']) == 97
+    assert fake.pages[ids[3]]['archived']
+
+
+def test_workers_are_used_from_the_size_of_the_database(fake, transport, monkeypatch, tmp_path):
+    # Pages given to workers are counted, and decoded in-process
+    decoded = []
+
+    async def decode_in_worker(self, page, schema):
+        decoded.append(page)
+        return self._decode_columns(json.loads(page), schema)
+
+    monkeypatch.setattr(AsyncNotion, '_decode_in_worker', decode_in_worker)
+    # Small databases are decoded in-process
+    N = connect(fake, transport, stream=True, workers=2)
+    assert N.export(str(tmp_path / 'small.ncol')) == 100
+    assert not decoded
+    fake.rows.extend(generate_rows(300)[100:])
+    monkeypatch.setattr(AsyncNotion, 'parallel_min_rows', 150)
+    # Size is not known on the first stream, so workers are used once 150 rows have been streamed
+    N = connect(fake, transport, stream=True, workers=2)
+    assert N.export(str(tmp_path / 'first.ncol')) == 300
+    assert len(decoded) == 1
+    # Every page of a database of known size is decoded by workers
+    assert N.export(str(tmp_path / 'next.ncol')) == 300
+    assert len(decoded) == 4
+    assert N.get('Name') == [f'Item {i}' for i in range(300)]
+
+
+def test_query_does_not_download_database(large, transport):
+    requests = large.requests
+    N = connect(large, transport)
+    assert N.where('Name', '==', 'Item 5').ids() == [large.rows[5]['id']]
+    # Types of columns come from the database object, so only the matching rows are downloaded
+    assert large.requests - requests == 2
+    assert not N._loaded
+
+
+def test_async_query_before_load(large, transport):
+    async def main():
+        A = AsyncNotion(large.database_id, transport=transport, api_url=Notion.api_url, key='test')
+        return await A.where('Number', '==', 3).where('Name', 'ends_with', '1').get('Name')
+
+    names = [value(row['properties']['Name']) for row in large.rows
+             if value(row['properties']['Number']) == 3 and value(row['properties']['Name']).endswith('1')]
+    assert names
+    assert asyncio.run(main()) == names
+
+
+def test_set_many_reports_unknown_columns(fake, transport):
+    N = connect(fake, transport).load()
+    report = N.set_many([(0, 'Number', 5), (1, 'Nope', 3), (2, 'Formula', 1)])
+    reports = {row['index']: row for row in report}
+    assert reports[0]['ok']
+    assert not reports[1]['ok'] and reports[1]['error'] == 'Column "Nope" not found'
+    assert not reports[2]['ok'] and reports[2]['error'] == 'Column "Formula" cannot be set'
+    assert fake.rows[0]['properties']['Number']['number'] == 5
+    assert N.get('Number')[0] == 5
+
+
+def test_add_many_to_empty_database(transport, monkeypatch):
+    fake = FakeNotion(0)
+    monkeypatch.setattr(Notion, 'api_url', fake.start())
+    try:
+        N = connect(fake, transport).load()
+        assert N.get('Name') == []
+        report = N.add_many([{'Name': 'First', 'Number': 1}, {'Name': 'Second', 'Nope': 2}])
+        assert report[0]['ok']
+        assert report[1]['error'] == 'Column "Nope" not found'
+        assert N.get('Name') == ['First']
+        assert N.id('First') == fake.rows[0]['id']
+    finally:
+        fake.stop()
+
+
+class ThrottleOnceHandler(BaseHTTPRequestHandler):
+    """
+    Answers the first request to each path with 429 and the 'Retry-After' header of the server, and later requests
+    with an empty page
+    """
+    protocol_version = 'HTTP/1.1'
+    retry_after = None
+    seen = set()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        throttled = self.path not in self.seen
+        self.seen.add(self.path)
+        body = json.dumps({'object': 'error', 'status': 429} if throttled else {'object': 'page'}).encode()
+        self.send_response(429 if throttled else 200)
+        if throttled:
+            self.send_header('Retry-After', self.retry_after)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.mark.parametrize('retry_after, min_delay, max_delay', [
+    ('soon', 0, 0.5),
+    ('nan', 0, 0.5),
+    (email.utils.formatdate(0, usegmt=True), 0, 0.5),
+    ('1', 1, 2),
+])
+def test_retry_after_header_is_parsed_defensively(retry_after, min_delay, max_delay):
+    handler = type('Handler', (ThrottleOnceHandler,), {'retry_after': retry_after, 'seen': set()})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    transport = Transport(rate=1000, burst=1000, backoff=0.01)
+    try:
+        urls = [f'http://127.0.0.1:{server.server_port}/v1/pages/{i}' for i in range(3)]
+        start = time.monotonic()
+        responses = transport.run(transport.request_all('GET', urls, {}))
+        assert min_delay <= time.monotonic() - start < max_delay
+        assert [response['object'] for response in responses] == ['page'] * 3
+    finally:
+        transport.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_settings_are_read_without_loading(fake, transport):
+    N = connect(fake, transport)
+    assert N.database_id == fake.database_id
+    assert N.URL.endswith(f'/databases/{fake.database_id}/query')
+    assert N.name_text == 'Name'
+    assert not hasattr(N, 'missing')
+    assert fake.requests == 0
+    assert not N._loaded
+    # Data is loaded when first read
+    assert len(N.data['results']) == 100
+    assert N._loaded
+
+
+def test_blocks_are_yielded_breadth_first(fake, transport):
+    N = connect(fake, transport)
+    # Page 0 has paginated children
+    pages = [fake.rows[0], fake.rows[1]]
+    expected = {}
+    for page in pages:
+        expected.update(generate_blocks(page))
+    # Children are fetched, then read from the cache
+    for _ in range(2):
+        blocks = list(N.blocks([0, 1]))
+        assert len(blocks) == sum(len(children) for children in expected.values()) == 156 + 6
+        # Children of each page or block are yielded together and in order, after their parent
+        positions = {block['id']: position for position, block in enumerate(blocks)}
+        for parent, children in expected.items():
+            start = positions[children[0]['id']]
+            assert blocks[start:start + len(children)] == children
+            assert parent not in positions or positions[parent] < start
+    assert [block['type'] for block in N.blocks([1], max_depth=1)] == ['heading_1', 'paragraph', 'toggle']
+
+
+def test_numbers_are_returned_exactly(fake, transport, tmp_path):
+    numbers = [3, 2.5, 2 ** 53 + 1, 2 ** 70, None, -7]
+    for row, number in zip(fake.rows, numbers):
+        row['properties']['Number']['number'] = number
+    N = connect(fake, transport, cache_dir=tmp_path).load()
+    assert N.get('Number')[:6] == numbers
+    assert [type(number) for number in N.get('Number')[:6]] == [type(number) for number in numbers]
+    assert all(type(number) is int for number in N.get('Number')[6:] if number is not None)
+    N.set(6, 'Number', 0.5)
+    assert N.get('Number')[6] == 0.5
+    # Numbers are kept exactly in the snapshot
+    N.save_snapshot()
+    N = connect(fake, transport, cache_dir=tmp_path, revalidate=False).load()
+    assert N.get('Number')[:7] == numbers + [0.5]
+
+
+def read_export(path, export_format):
+    """
+    Reads an exported file back into the list of IDs and a dictionary of column name -> list of values
+    """
+    if export_format == 'columnar':
+        exported = ColumnarFile(path)
+        return exported.ids(), {column_name: exported.column(column_name) for column_name in exported.schema}
+    with open(path, encoding='utf-8', newline='') as f:
+        if export_format == 'ndjson':
+            rows = [json.loads(line) for line in f]
+        else:
+            rows = list(csv.DictReader(f))
+    return [row.pop('id') for row in rows], {column_name: [row[column_name] for row in rows] for column_name in rows[0]}
+
+
+def csv_field(value):
+    """
+    Gets value as written to a CSV file
+    """
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+@pytest.mark.parametrize('export_format', ['ndjson', 'csv', 'columnar'])
+@pytest.mark.parametrize('stream', [False, True])
+def test_export_round_trip(fake, transport, tmp_path, export_format, stream):
+    N = connect(fake, transport)
+    expected = {column_name: N.get(column_name) for column_name in N._schema}
+    # Relations are exported as the IDs included in the rows
+    expected['Projects'] = [[item['id'] for item in row['properties']['Projects']['relation']] for row in fake.rows]
+    path = str(tmp_path / f'rows.{export_format}')
+    # Chunks smaller than the database, and pages smaller than chunks in stream mode
+    E = connect(fake, transport, stream=stream, page_size=25)
+    assert E.export(path, format=export_format, chunk_size=30) == len(fake.rows)
+    ids, columns = read_export(path, export_format)
+    assert ids == [row['id'] for row in fake.rows]
+    assert list(columns) == list(expected)
+    if export_format == 'csv':
+        expected = {column_name: [csv_field(value) for value in values] for column_name, values in expected.items()}
+    assert columns == expected
+
+
+def test_export_of_some_columns(fake, transport, tmp_path):
+    N = connect(fake, transport)
+    path = str(tmp_path / 'rows.ncol')
+    N.export(path, column_names=['Status', 'Number'])
+    exported = ColumnarFile(path)
+    assert len(exported) == len(fake.rows)
+    assert list(exported.schema) == ['Status', 'Number']
+    assert exported.column('Status') == N.get('Status')
+    with pytest.raises(ValueError):
+        exported.column('Name')
+
+
+def test_join_rollup_matches_get(fake, transport):
+    N = connect(fake, transport).load()
+    requests = fake.requests
+    rollup = N.get('Rollup')
+    fetched = fake.requests - requests
+    requests = fake.requests
+    assert N.join_rollup('Rollup') == rollup
+    # The related database is downloaded with its query endpoint, instead of fetching the rollup of each row
+    assert fake.requests - requests < fetched / 2
+
+
+def test_join_follows_relations(fake, transport):
+    N = connect(fake, transport)
+    projects = N.get('Projects')
+    assert N.join('Projects', 'Budget') == [
+        [fake.pages[page_id]['properties']['Budget']['number'] for page_id in pages] for pages in projects
+    ]
+    # Teams of the projects of each row, each team once
+    teams = [
+        dict.fromkeys(item['id'] for page_id in pages for item in fake.pages[page_id]['properties']['Team']['relation'])
+        for pages in projects
+    ]
+    expected = [[value(fake.pages[page_id]['properties']['Name']) for page_id in pages] for pages in teams]
+    assert N.join(['Projects', 'Team']) == expected
+    assert any(len(names) > 1 for names in expected)
+
+
+def test_poll_finds_added_changed_and_removed_rows(fake, transport):
+    N = connect(fake, transport).load()
+    assert N.poll() == []
+    old = N.get('Number')[5]
+    fake.update(fake.rows[5], {'properties': {'Number': {'number': 1000}}})
+    added = fake.create({'properties': {'Name': {'title': [{'text': {'content': 'New'}}]}}})
+    removed = fake.rows[7]
+    fake.update(removed, {'archived': True})
+    events = N.poll()
+    assert [(event.type, event.id) for event in events] == [('changed', fake.rows[5]['id']), ('added', added['id'])]
+    assert events[0].changes == {'Number': (old, 1000)}
+    assert events[1].changes['Name'] == (None, 'New')
+    # Queries do not return archived rows, so only a full poll finds them
+    events = N.poll(full=True)
+    assert [(event.type, event.id) for event in events] == [('removed', removed['id'])]
+    assert events[0].changes['Name'] == ('Item 7', None)
+    assert N.poll(full=True) == []
+    assert N.get('Name') == [value(row['properties']['Name']) for row in fake.rows if not row['archived']]
+
+
+def test_watch_calls_registered_functions(fake, transport):
+    N = connect(fake, transport).load()
+    events = []
+    N.on('added', events.append)
+    N.on('removed', events.append)
+
+    def stop(event):
+        N.stop()
+        raise RuntimeError('Errors of callbacks are logged')
+
+    N.on('removed', stop)
+    with pytest.raises(ValueError):
+        N.on('edited', stop)
+    added = fake.create({'properties': {'Name': {'title': [{'text': {'content': 'New'}}]}}})
+    fake.update(fake.rows[7], {'archived': True})
+    N.watch(min_interval=0.01, full_interval=0)
+    assert [(event.type, event.id) for event in events] == [('added', added['id']), ('removed', fake.rows[7]['id'])]
+
+
+def test_async_watch_awaits_coroutine_callbacks(fake, transport):
+    async def main():
+        A = AsyncNotion(fake.database_id, transport=transport, api_url=Notion.api_url, key='test')
+        await A.load()
+        events = []
+
+        async def changed(event):
+            events.append(event)
+            A.stop()
+
+        A.on('changed', changed)
+        fake.update(fake.rows[5], {'properties': {'Status': {'status': {'name': 'Done'}}}})
+        await A.watch(min_interval=0.01, full_interval=None)
+        return events
+
+    events = asyncio.run(main())
+    assert [(event.type, event.id) for event in events] == [('changed', fake.rows[5]['id'])]
+    assert events[0].changes['Status'][1] == 'Done'
+
+
+def test_snapshot_is_opened_without_requests(fake, transport, tmp_path):
+    N = connect(fake, transport, cache_dir=tmp_path).load()
+    # Rollups and relations are not stored in snapshots
+    column_names = [name for name, item in N._schema.items() if item['type'] not in ('rollup', 'relation')]
+    columns = {column_name: N.get(column_name) for column_name in column_names}
+    requests = fake.requests
+    S = connect(fake, transport, cache_dir=tmp_path, revalidate=False).load()
+    assert S.id_all() == [row['id'] for row in fake.rows]
+    assert {column_name: S.get(column_name) for column_name in column_names} == columns
+    assert S.data['results'] == N.data['results']
+    assert fake.requests == requests
+
+
+def test_revalidate_picks_up_remote_edits(fake, transport, tmp_path):
+    connect(fake, transport, cache_dir=tmp_path).load()
+    old = value(fake.rows[5]['properties']['Number'])
+    fake.update(fake.rows[5], {'properties': {'Number': {'number': 1000}}})
+    added = fake.create({'properties': {'Name': {'title': [{'text': {'content': 'New'}}]}}})
+    N = connect(fake, transport, cache_dir=tmp_path, revalidate=False).load()
+    assert N.get('Number')[5] == old
+    N.revalidate()
+    assert N.get('Number')[5] == 1000
+    assert N.id_all()[-1] == added['id']
+    # Revalidated data is saved to the snapshot
+    requests = fake.requests
+    N = connect(fake, transport, cache_dir=tmp_path, revalidate=False).load()
+    assert N.get('Number')[5] == 1000
+    assert N.get('Name')[-1] == 'New'
+    assert fake.requests == requests